@@ -333,13 +333,17 @@ class KiroAuthManager:
         base_delay = 1.0  # 初始延迟1秒
         last_error = None
 
+        # Shared pooled client: keeps TLS connections alive across refreshes of many tokens
+        # (imported here because http_client imports this module)
+        from kiro_gateway.http_client import global_http_client_manager
+        client = await global_http_client_manager.get_client()
+
         for attempt in range(max_retries):
             try:
-                async with httpx.AsyncClient(timeout=30) as client:
-                    # Both endpoints use JSON
-                    response = await client.post(refresh_url, json=payload, headers=headers)
-                    response.raise_for_status()
-                    data = response.json()
+                # Both endpoints use JSON
+                response = await client.post(refresh_url, json=payload, headers=headers, timeout=30)
+                response.raise_for_status()
+                data = response.json()
                 break  # 成功，退出重试循环
             except httpx.HTTPStatusError as e:
                 last_error = e
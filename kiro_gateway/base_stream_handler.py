@@ -25,17 +25,24 @@
 """
 
 import asyncio
-import json
 import time
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING, AsyncGenerator, Dict, List, Optional, Any
+from collections.abc import AsyncGenerator, AsyncIterator
+from typing import TYPE_CHECKING, Any
 
 import httpx
 from loguru import logger
 
 from kiro_gateway.parsers import AwsEventStreamParser, parse_bracket_tool_calls, deduplicate_tool_calls
 from kiro_gateway.config import settings
-from kiro_gateway.tokenizer import count_tokens, count_message_tokens, count_tools_tokens
+from kiro_gateway.utils import anext_with_timeout
+from kiro_gateway.tokenizer import (
+    CLAUDE_CORRECTION_FACTOR,
+    count_tokens,
+    count_message_tokens,
+    count_tools_tokens,
+    get_encoding,
+)
 
 if TYPE_CHECKING:
     from kiro_gateway.auth import KiroAuthManager
@@ -62,8 +69,32 @@ class BaseStreamHandler(ABC):
     - AWS Event Stream 解析
     - Token 计数
     - Tool calls 处理
+
+    每个请求都会创建一个实例，因此使用 __slots__；子类需声明自己的
+    __slots__（没有新增属性时为 ()），否则会重新引入 __dict__。
     """
 
+    __slots__ = (
+        "client",
+        "response",
+        "model",
+        "model_cache",
+        "auth_manager",
+        "first_token_timeout",
+        "request_messages",
+        "request_tools",
+        "parser",
+        "completion_id",
+        "created_time",
+        "_content_parts",
+        "_maybe_has_brackets",
+        "metering_data",
+        "context_usage_percentage",
+        "_encoder",
+        "_completion_tokens_running",
+        "_byte_iterator",
+    )
+
     def __init__(
         self,
         client: httpx.AsyncClient,
@@ -72,8 +103,9 @@ class BaseStreamHandler(ABC):
         model_cache: "ModelInfoCache",
         auth_manager: "KiroAuthManager",
         first_token_timeout: float = settings.first_token_timeout,
-        request_messages: Optional[List] = None,
-        request_tools: Optional[List] = None
+        request_messages: list | None = None,
+        request_tools: list | None = None,
+        created_time: int | None = None
     ):
         """
         初始化基础流处理器。
@@ -87,6 +119,7 @@ class BaseStreamHandler(ABC):
             first_token_timeout: 首个 token 超时时间（秒）
             request_messages: 请求消息（用于 token 计数）
             request_tools: 请求工具（用于 token 计数）
+            created_time: 请求接收时的 Unix 时间戳（默认在此处取当前时间）
         """
         self.client = client
         self.response = response
@@ -100,10 +133,23 @@ class BaseStreamHandler(ABC):
         # 初始化解析器和状态
         self.parser = AwsEventStreamParser()
         self.completion_id = self._generate_completion_id()
-        self.created_time = int(time.time())
-        self.full_content = ""
+        self.created_time = created_time if created_time is not None else int(time.time())
+        self._content_parts: list[str] = []  # 使用 list 替代字符串拼接，提升性能
+        # 内容中是否出现过 "["（bracket 格式 tool call 的必要条件）
+        self._maybe_has_brackets = False
         self.metering_data = None
         self.context_usage_percentage = None
+        # 解析一次 tokenizer，整个流内复用
+        self._encoder = get_encoding()
+        # 流式过程中逐块累计的 completion token 数（未做 Claude 修正）
+        self._completion_tokens_running = 0
+        # 首个块与后续块共用同一个字节迭代器
+        self._byte_iterator: AsyncIterator[bytes] | None = None
+
+    @property
+    def full_content(self) -> str:
+        """完整的响应内容（按需合并已接收的内容片段）。"""
+        return "".join(self._content_parts)
 
     @abstractmethod
     def _generate_completion_id(self) -> str:
@@ -111,7 +157,7 @@ class BaseStreamHandler(ABC):
         pass
 
     @abstractmethod
-    def _format_content_chunk(self, content: str, first_chunk: bool) -> Dict[str, Any]:
+    def _format_content_chunk(self, content: str, first_chunk: bool) -> dict[str, Any]:
         """
         格式化内容块。
 
@@ -125,7 +171,7 @@ class BaseStreamHandler(ABC):
         pass
 
     @abstractmethod
-    def _format_tool_calls_chunk(self, tool_calls: List[Dict], index: int) -> Dict[str, Any]:
+    def _format_tool_calls_chunk(self, tool_calls: list[dict], index: int) -> dict[str, Any]:
         """
         格式化 tool calls 块。
 
@@ -145,7 +191,7 @@ class BaseStreamHandler(ABC):
         prompt_tokens: int,
         completion_tokens: int,
         total_tokens: int
-    ) -> Dict[str, Any]:
+    ) -> dict[str, Any]:
         """
         格式化最终块。
 
@@ -161,19 +207,22 @@ class BaseStreamHandler(ABC):
         pass
 
     @abstractmethod
-    def _serialize_chunk(self, chunk: Dict[str, Any]) -> str:
+    def _serialize_chunk(self, chunk: dict[str, Any]) -> bytes:
         """
-        序列化块为字符串。
+        序列化块为 SSE 字节串。
+
+        子类按各自协议（OpenAI data 行、Anthropic event）输出 bytes，
+        StreamingResponse 无需再做一次 str -> bytes 编码。
 
         Args:
-            chunk: 块数据
+            chunk: 块数据（{"type": "done"} 表示流结束）
 
         Returns:
-            序列化后的字符串
+            序列化后的字节串
         """
         pass
 
-    async def _read_first_chunk_with_timeout(self) -> Optional[bytes]:
+    async def _read_first_chunk_with_timeout(self) -> bytes | None:
         """
         读取首个字节块，带超时。
 
@@ -183,13 +232,10 @@ class BaseStreamHandler(ABC):
         Raises:
             FirstTokenTimeoutError: 超时异常
         """
-        byte_iterator = self.response.aiter_bytes()
+        self._byte_iterator = self.response.aiter_bytes()
 
         try:
-            first_byte_chunk = await asyncio.wait_for(
-                byte_iterator.__anext__(),
-                timeout=self.first_token_timeout
-            )
+            first_byte_chunk = await anext_with_timeout(self._byte_iterator, self.first_token_timeout)
             return first_byte_chunk
         except asyncio.TimeoutError:
             logger.warning(f"First token timeout after {self.first_token_timeout}s")
@@ -199,7 +245,7 @@ class BaseStreamHandler(ABC):
             logger.debug("Empty response from Kiro API")
             return None
 
-    def _process_events(self, events: List[Dict], first_chunk: bool) -> Optional[str]:
+    def _process_events(self, events: list[dict], first_chunk: bool) -> str | None:
         """
         处理解析的事件。
 
@@ -215,7 +261,13 @@ class BaseStreamHandler(ABC):
         for event in events:
             if event["type"] == "content":
                 content = event["data"]
-                self.full_content += content
+                self._content_parts.append(content)
+                if not self._maybe_has_brackets and "[" in content:
+                    self._maybe_has_brackets = True
+                if self._encoder and content:
+                    self._completion_tokens_running += len(
+                        self._encoder.encode(content, disallowed_special=())
+                    )
             elif event["type"] == "usage":
                 self.metering_data = event["data"]
             elif event["type"] == "context_usage":
@@ -223,55 +275,116 @@ class BaseStreamHandler(ABC):
 
         return content
 
-    def _calculate_tokens(self) -> tuple[int, int, int]:
+    def _count_completion_tokens(self) -> int:
         """
-        计算 token 数量。
+        返回 completion token 数。
+
+        tiktoken 可用时直接使用流式过程中累计的结果，避免在流结束时
+        对完整内容重新编码；否则回退到基于完整内容的估算。
+
+        Returns:
+            completion token 数（含 Claude 修正）
+        """
+        if self._encoder:
+            return int(self._completion_tokens_running * CLAUDE_CORRECTION_FACTOR)
+        return count_tokens(self.full_content)
+
+    def _api_output_tokens(self) -> int | None:
+        """
+        从 metering 数据中提取 API 报告的输出 token 数。
+
+        Kiro 的 usage 事件通常只包含 credits 数值；仅当其为带有
+        outputTokens 字段的字典时才返回该值。
+
+        Returns:
+            API 报告的输出 token 数，不可用时返回 None
+        """
+        data = self.metering_data
+        if isinstance(data, dict):
+            value = data.get("outputTokens", data.get("output_tokens"))
+            if isinstance(value, int) and value > 0:
+                return value
+        return None
+
+    def _tokens_from_api(self) -> tuple[int, int, int] | None:
+        """
+        根据 API 返回的上下文使用百分比计算 token 数量。
+
+        不会调用 count_message_tokens / count_tools_tokens；子类可覆盖此方法
+        以直接使用上游在最终事件中返回的 usage。
+
+        Returns:
+            (prompt_tokens, completion_tokens, total_tokens)，API 数据不可用时返回 None
+        """
+        if not self.context_usage_percentage or self.context_usage_percentage <= 0:
+            return None
+
+        max_input_tokens = self.model_cache.get_max_input_tokens(self.model)
+        total_tokens = int((self.context_usage_percentage / 100) * max_input_tokens)
+        if total_tokens <= 0:
+            return None
+
+        # API 同时报告输出 token 时跳过本地计数
+        api_output_tokens = self._api_output_tokens()
+        if api_output_tokens is not None:
+            completion_tokens = api_output_tokens
+            completion_source = "API Kiro"
+        else:
+            completion_tokens = self._count_completion_tokens()
+            completion_source = "tiktoken"
+        prompt_tokens = max(0, total_tokens - completion_tokens)
+        logger.debug(
+            f"[Usage] {self.model}: "
+            f"prompt_tokens={prompt_tokens} (subtraction), "
+            f"completion_tokens={completion_tokens} ({completion_source}), "
+            f"total_tokens={total_tokens} (API Kiro)"
+        )
+        return prompt_tokens, completion_tokens, total_tokens
+
+    def _tokens_from_tiktoken(self) -> tuple[int, int, int]:
+        """
+        使用 tiktoken 计算 token 数量（API 数据不可用时的回退路径）。
 
         Returns:
             (prompt_tokens, completion_tokens, total_tokens)
         """
-        # 计算 completion_tokens（输出）
-        completion_tokens = count_tokens(self.full_content)
-
-        # 根据上下文使用百分比计算总 token 数
-        total_tokens_from_api = 0
-        if self.context_usage_percentage is not None and self.context_usage_percentage > 0:
-            max_input_tokens = self.model_cache.get_max_input_tokens(self.model)
-            total_tokens_from_api = int((self.context_usage_percentage / 100) * max_input_tokens)
-
-        if total_tokens_from_api > 0:
-            # 使用 API 数据
-            prompt_tokens = max(0, total_tokens_from_api - completion_tokens)
-            total_tokens = total_tokens_from_api
-            logger.debug(
-                f"[Usage] {self.model}: "
-                f"prompt_tokens={prompt_tokens} (subtraction), "
-                f"completion_tokens={completion_tokens} (tiktoken), "
-                f"total_tokens={total_tokens} (API Kiro)"
+        completion_tokens = self._count_completion_tokens()
+        prompt_tokens = 0
+        if self.request_messages:
+            prompt_tokens += count_message_tokens(
+                self.request_messages, apply_claude_correction=False, encoding=self._encoder
             )
-        else:
-            # 使用 tiktoken 计算
-            prompt_tokens = 0
-            if self.request_messages:
-                prompt_tokens += count_message_tokens(self.request_messages, apply_claude_correction=False)
-            if self.request_tools:
-                prompt_tokens += count_tools_tokens(self.request_tools, apply_claude_correction=False)
-            total_tokens = prompt_tokens + completion_tokens
-            logger.debug(
-                f"[Usage] {self.model}: "
-                f"prompt_tokens={prompt_tokens} (tiktoken), "
-                f"completion_tokens={completion_tokens} (tiktoken), "
-                f"total_tokens={total_tokens} (tiktoken)"
+        if self.request_tools:
+            prompt_tokens += count_tools_tokens(
+                self.request_tools, apply_claude_correction=False, encoding=self._encoder
             )
-
+        total_tokens = prompt_tokens + completion_tokens
+        logger.debug(
+            f"[Usage] {self.model}: "
+            f"prompt_tokens={prompt_tokens} (tiktoken), "
+            f"completion_tokens={completion_tokens} (tiktoken), "
+            f"total_tokens={total_tokens} (tiktoken)"
+        )
         return prompt_tokens, completion_tokens, total_tokens
 
-    async def stream(self) -> AsyncGenerator[str, None]:
+    def _calculate_tokens(self) -> tuple[int, int, int]:
+        """
+        计算 token 数量：优先使用 API 数据，仅在不可用时回退到 tiktoken。
+
+        Returns:
+            (prompt_tokens, completion_tokens, total_tokens)
+        """
+        tokens = self._tokens_from_api()
+        if tokens is None:
+            tokens = self._tokens_from_tiktoken()
+        return tokens
+
+    async def stream(self) -> AsyncGenerator[bytes, None]:
         """
         执行流式处理。
 
         Yields:
-            序列化的块字符串
+            SSE 格式的字节串
         """
         try:
             # 读取首个块
@@ -294,8 +407,9 @@ class BaseStreamHandler(ABC):
                 yield self._serialize_chunk(chunk)
                 first_chunk_sent = True
 
-            # 继续读取剩余块
-            async for chunk in self.response.aiter_bytes():
+            # 继续读取剩余块：httpx 每次读取已返回 socket 中全部可用字节，
+            # 到达即交给解析器，不额外等待凑批
+            async for chunk in self._byte_iterator:
                 if debug_logger:
                     debug_logger.log_raw_chunk(chunk)
 
@@ -308,9 +422,12 @@ class BaseStreamHandler(ABC):
                     first_chunk_sent = True
 
             # 处理 tool calls
-            bracket_tool_calls = parse_bracket_tool_calls(self.full_content)
-            all_tool_calls = self.parser.get_tool_calls() + bracket_tool_calls
-            all_tool_calls = deduplicate_tool_calls(all_tool_calls)
+            # 未出现过 "[" 时无需合并全文并扫描 bracket tool calls
+            if self._maybe_has_brackets:
+                bracket_tool_calls = parse_bracket_tool_calls(self.full_content)
+            else:
+                bracket_tool_calls = []
+            all_tool_calls = deduplicate_tool_calls(self.parser.get_tool_calls(), bracket_tool_calls)
 
             if all_tool_calls:
                 logger.debug(f"Processing {len(all_tool_calls)} tool calls for streaming response")
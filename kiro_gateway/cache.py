@@ -28,10 +28,12 @@ import time
 from typing import Any, Dict, List, Optional
 
 import httpx
+import orjson
 from loguru import logger
 
 from kiro_gateway.config import MODEL_CACHE_TTL, DEFAULT_MAX_INPUT_TOKENS
 from kiro_gateway.http_client import global_http_client_manager
+from kiro_gateway.utils import get_kiro_headers
 
 
 class ModelInfoCache:
@@ -50,10 +52,12 @@ class ModelInfoCache:
             cache_ttl: Cache TTL in seconds (default from config)
         """
         self._cache: Dict[str, Dict[str, Any]] = {}
-        self._lock = asyncio.Lock()
         self._last_update: Optional[float] = None
+        # Monotonic clock for TTL checks; _last_update stays wall-clock for display
+        self._last_update_monotonic: Optional[float] = None
         self._cache_ttl = cache_ttl
         self._refresh_task: Optional[asyncio.Task] = None
+        self._refresh_inflight: Optional[asyncio.Future] = None
         self._auth_manager = None
 
     def set_auth_manager(self, auth_manager) -> None:
@@ -65,20 +69,23 @@ class ModelInfoCache:
         """
         self._auth_manager = auth_manager
 
-    async def update(self, models_data: List[Dict[str, Any]]) -> None:
+    def update(self, models_data: List[Dict[str, Any]]) -> None:
         """
         Update model cache.
 
-        Thread-safely replaces cache content with new data.
+        Builds the new mapping off to the side and swaps it in with a single
+        reference assignment, so readers never see a partially built dict
+        and no lock is needed.
 
         Args:
             models_data: List of model info dictionaries.
                         Each dict should contain "modelId" key.
         """
-        async with self._lock:
-            logger.info(f"Updating model cache. Found {len(models_data)} models.")
-            self._cache = {model["modelId"]: model for model in models_data}
-            self._last_update = time.time()
+        logger.info(f"Updating model cache. Found {len(models_data)} models.")
+        new_cache = {model["modelId"]: model for model in models_data}
+        self._cache = new_cache
+        self._last_update = time.time()
+        self._last_update_monotonic = time.monotonic()
 
     async def refresh(self) -> bool:
         """
@@ -93,7 +100,6 @@ class ModelInfoCache:
 
         try:
             token = await self._auth_manager.get_access_token()
-            from kiro_gateway.utils import get_kiro_headers
             headers = get_kiro_headers(self._auth_manager, token)
 
             # Use global connection pool instead of creating new client
@@ -109,9 +115,9 @@ class ModelInfoCache:
             )
 
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 models_list = data.get("models", [])
-                await self.update(models_list)
+                self.update(models_list)
                 logger.info(f"Successfully refreshed model cache with {len(models_list)} models")
                 return True
             else:
@@ -122,6 +128,29 @@ class ModelInfoCache:
             logger.error(f"Error refreshing model cache: {e}")
             return False
 
+    async def ensure_fresh(self) -> bool:
+        """
+        Refresh cache if stale, sharing a single in-flight refresh.
+
+        Concurrent callers on a stale cache await the same refresh instead
+        of each issuing their own ListAvailableModels request.
+
+        Returns:
+            True if cache is fresh or refresh succeeded, False otherwise
+        """
+        if not self.is_stale():
+            return True
+
+        if self._refresh_inflight is None:
+            self._refresh_inflight = asyncio.ensure_future(self.refresh())
+            self._refresh_inflight.add_done_callback(self._clear_refresh_inflight)
+        return await asyncio.shield(self._refresh_inflight)
+
+    def _clear_refresh_inflight(self, future: asyncio.Future) -> None:
+        """Drop the finished in-flight refresh so the next stale check starts a new one."""
+        if self._refresh_inflight is future:
+            self._refresh_inflight = None
+
     async def start_background_refresh(self) -> None:
         """
         Start background refresh task.
@@ -210,9 +239,9 @@ class ModelInfoCache:
             True if cache is stale (older than cache_ttl seconds)
             or cache was never updated
         """
-        if not self._last_update:
+        if self._last_update_monotonic is None:
             return True
-        return time.time() - self._last_update > self._cache_ttl
+        return time.monotonic() - self._last_update_monotonic > self._cache_ttl
 
     def get_all_model_ids(self) -> List[str]:
         """
@@ -230,7 +259,7 @@ class ModelInfoCache:
 
     @property
     def last_update_time(self) -> Optional[float]:
-        """Last update timestamp (seconds) or None."""
+        """Last update Unix timestamp (seconds) or None."""
         return self._last_update
 
     @property
@@ -25,13 +25,44 @@ KiroGate 配置模块。
 """
 
 import re
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional
 
 from pydantic import Field, field_validator, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+# .env 行格式：NAME=value / NAME="value" / NAME='value'
+_ENV_LINE_RE = re.compile(r'^([A-Za-z_][A-Za-z0-9_]*)=(["\']?)(.+?)\2\s*$')
+
+
+@lru_cache(maxsize=1)
+def _parse_raw_env_file(env_file: str, mtime: float) -> Dict[str, str]:
+    """
+    一次性解析 .env 文件为原始值字典（按 (路径, mtime) 缓存）。
+
+    Args:
+        env_file: .env 文件路径
+        mtime: 文件修改时间（仅用作缓存键，文件变化后自动重新解析）
+
+    Returns:
+        变量名 -> 原始值 的字典（同名变量以首次出现为准）
+    """
+    values: Dict[str, str] = {}
+    content = Path(env_file).read_text(encoding="utf-8")
+    for line in content.splitlines():
+        line = line.strip()
+        if line.startswith("#") or not line:
+            continue
+
+        match = _ENV_LINE_RE.match(line)
+        if match:
+            values.setdefault(match.group(1), match.group(3))
+    return values
+
+
 def _get_raw_env_value(var_name: str, env_file: str = ".env") -> Optional[str]:
     """
     从 .env 文件读取原始变量值，不处理转义序列。
@@ -46,27 +77,14 @@ def _get_raw_env_value(var_name: str, env_file: str = ".env") -> Optional[str]:
     Returns:
         原始变量值，如果未找到则返回 None
     """
-    env_path = Path(env_file)
-    if not env_path.exists():
-        return None
-
     try:
-        content = env_path.read_text(encoding="utf-8")
-        pattern = rf'^{re.escape(var_name)}=(["\']?)(.+?)\1\s*$'
-
-        for line in content.splitlines():
-            line = line.strip()
-            if line.startswith("#") or not line:
-                continue
-
-            match = re.match(pattern, line)
-            if match:
-                return match.group(2)
+        mtime = Path(env_file).stat().st_mtime
+        return _parse_raw_env_file(env_file, mtime).get(var_name)
     except (FileNotFoundError, PermissionError, OSError) as e:
         # File not found or permission issues are expected when env file doesn't exist
         pass
-    except (re.error, ValueError) as e:
-        # Regex or parsing errors - log but don't fail
+    except ValueError as e:
+        # Parsing errors - log but don't fail
         from loguru import logger
         logger.debug(f"Error parsing env file for {var_name}: {e}")
 
@@ -126,6 +144,25 @@ class Settings(BaseSettings):
     # 重试基础延迟（秒）- 使用指数退避：delay * (2 ** attempt)
     base_retry_delay: float = Field(default=1.0, alias="BASE_RETRY_DELAY")
 
+    # 单次重试延迟上限（秒）
+    max_retry_delay: float = Field(default=30.0, alias="MAX_RETRY_DELAY")
+
+    # 重试抖动比例 - 实际延迟为 delay * (1 + random() * jitter)，避免并发请求同步重试
+    retry_jitter: float = Field(default=0.5, alias="RETRY_JITTER")
+
+    # ==================================================================================================
+    # HTTP 连接池设置
+    # ==================================================================================================
+
+    # 全局连接池最大连接数
+    http_max_connections: int = Field(default=500, alias="HTTP_MAX_CONNECTIONS")
+
+    # 最大空闲 keep-alive 连接数（建议不低于 max_connections 的 1/5，低于时启动告警）
+    http_max_keepalive: int = Field(default=100, alias="HTTP_MAX_KEEPALIVE")
+
+    # 空闲连接保持时间（秒）- 与 nginx 默认 keepalive_timeout 一致
+    http_keepalive_expiry: float = Field(default=75.0, alias="HTTP_KEEPALIVE_EXPIRY")
+
     # ==================================================================================================
     # 模型缓存设置
     # ==================================================================================================
@@ -136,6 +173,9 @@ class Settings(BaseSettings):
     # 默认最大输入 token 数
     default_max_input_tokens: int = Field(default=200000)
 
+    # Token 账户信息（GetUserUsageAndLimits）缓存 TTL（秒），0 表示禁用
+    token_info_ttl: float = Field(default=30.0, alias="TOKEN_INFO_TTL")
+
     # ==================================================================================================
     # Tool Description 处理（Kiro API 限制）
     # ==================================================================================================
@@ -357,6 +397,19 @@ class Settings(BaseSettings):
 
         return self
 
+    @model_validator(mode="after")
+    def validate_http_pool_limits(self) -> "Settings":
+        """keep-alive 池过小时告警：突发请求会频繁重新握手。按配置原样使用，不做修正。"""
+        from loguru import logger
+
+        recommended = self.http_max_connections // 5
+        if self.http_max_keepalive < recommended:
+            logger.warning(
+                f"HTTP_MAX_KEEPALIVE={self.http_max_keepalive} 低于 HTTP_MAX_CONNECTIONS 的 1/5 "
+                f"({recommended})，突发请求可能频繁重新建立 TLS 连接"
+            )
+        return self
+
 
 # Global settings instance
 settings = Settings()
@@ -452,7 +505,8 @@ KIRO_Q_HOST_TEMPLATE: str = "https://q.{region}.amazonaws.com"
 # ==================================================================================================
 
 # External model names (OpenAI compatible) -> Kiro internal ID
-MODEL_MAPPING: Dict[str, str] = {
+# Read-only view: the mapping is fixed at import time and looked up per request.
+MODEL_MAPPING: Mapping[str, str] = MappingProxyType({
     # Claude Opus 4.5 - Top tier model
     "claude-opus-4-5": "claude-opus-4.5",
     "claude-opus-4-5-20251101": "claude-opus-4.5",
@@ -475,7 +529,10 @@ MODEL_MAPPING: Dict[str, str] = {
 
     # Convenience aliases
     "auto": "claude-sonnet-4.5",
-}
+})
+
+# Kiro internal IDs accepted as-is (precomputed reverse lookup)
+INTERNAL_MODEL_IDS: frozenset = frozenset(MODEL_MAPPING.values())
 
 # Available models list for /v1/models endpoint
 AVAILABLE_MODELS: List[str] = [
@@ -527,12 +584,12 @@ def get_internal_model_id(external_model: str) -> str:
     Raises:
         ValueError: If model is not supported
     """
-    if external_model in MODEL_MAPPING:
-        return MODEL_MAPPING[external_model]
+    internal_id = MODEL_MAPPING.get(external_model)
+    if internal_id is not None:
+        return internal_id
 
     # 检查是否是有效的内部模型 ID（直接传递）
-    valid_internal_ids = set(MODEL_MAPPING.values())
-    if external_model in valid_internal_ids:
+    if external_model in INTERNAL_MODEL_IDS:
         return external_model
 
     available = ", ".join(sorted(AVAILABLE_MODELS))
@@ -24,6 +24,13 @@ from kiro_gateway.config import settings
 # Database file path
 USER_DB_FILE = os.getenv("USER_DB_FILE", "data/users.db")
 
+# Token account-info columns written by update_token_info / update_token_info_bulk
+TOKEN_INFO_FIELDS = (
+    "email", "idp", "subscription_type", "subscription_title",
+    "usage_current", "usage_limit", "base_current", "base_limit",
+    "trial_current", "trial_limit", "trial_expiry", "next_reset", "days_remaining",
+)
+
 
 def _derive_key(secret: str) -> bytes:
     """Derive a Fernet-compatible key from secret string."""
@@ -882,6 +889,28 @@ class UserDatabase:
             }
             return result
 
+    def get_active_token_credentials(self) -> Dict[int, Dict[str, Optional[str]]]:
+        """
+        Get decrypted credentials for all active tokens in one query.
+
+        Returns:
+            Dict mapping token ID to the same dict get_token_credentials returns
+        """
+        with self._get_conn() as conn:
+            rows = conn.execute(
+                """SELECT id, refresh_token_encrypted, client_id_encrypted, client_secret_encrypted
+                   FROM tokens WHERE status = 'active'"""
+            ).fetchall()
+
+        return {
+            row[0]: {
+                'refresh_token': self._decrypt_token(row[1]) if row[1] else None,
+                'client_id': self._decrypt_token(row[2]) if row[2] else None,
+                'client_secret': self._decrypt_token(row[3]) if row[3] else None,
+            }
+            for row in rows
+        }
+
     def set_token_visibility(self, token_id: int, visibility: str) -> bool:
         """Set token visibility (public/private)."""
         if visibility not in ("public", "private"):
@@ -1075,6 +1104,40 @@ class UserDatabase:
                 conn.commit()
                 return True
 
+    def update_token_info_bulk(self, rows: List[Dict]) -> int:
+        """
+        Update account information for many tokens in one transaction.
+
+        Each row takes the same keys as update_token_info (token_id plus info
+        fields). As there, None fields keep their current value and rows with
+        no fields at all are skipped.
+
+        Args:
+            rows: List of dicts with 'token_id' and TOKEN_INFO_FIELDS keys
+
+        Returns:
+            Number of tokens updated
+        """
+        now = int(time.time() * 1000)
+        params = []
+        for row in rows:
+            values = [row.get(field) for field in TOKEN_INFO_FIELDS]
+            if all(v is None for v in values):
+                continue
+            params.append((*values, now, row["token_id"]))
+
+        if not params:
+            return 0
+
+        # COALESCE keeps the existing value for None fields, so one statement fits every row
+        assignments = ", ".join(f"{field} = COALESCE(?, {field})" for field in TOKEN_INFO_FIELDS)
+        sql = f"UPDATE tokens SET {assignments}, info_updated_at = ? WHERE id = ?"
+
+        with self._lock:
+            with self._get_conn() as conn:
+                conn.executemany(sql, params)
+        return len(params)
+
     def _row_to_token(self, row: sqlite3.Row) -> DonatedToken:
         """Convert database row to DonatedToken object."""
         # Get column names to check which fields exist
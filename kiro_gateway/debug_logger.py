@@ -49,10 +49,14 @@ class DebugLogger:
     Режимы работы:
     - off: ничего не делает
     - errors: буферизует данные, сбрасывает в файлы только при ошибках
-    - all: пишет данные сразу в файлы (как раньше)
+    - all: пишет данные в файлы пакетами (чанки копятся в буфере
+      до _WRITE_BATCH_SIZE байт и сбрасываются одной записью)
     """
     _instance = None
 
+    # Размер пакета для записи чанков в режиме "all"
+    _WRITE_BATCH_SIZE = 64 * 1024
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(DebugLogger, cls).__new__(cls)
@@ -189,33 +193,31 @@ class DebugLogger:
         """
         Дописывает сырой чанк ответа (от провайдера).
         
-        В режиме "all": пишет сразу в файл.
+        В режиме "all": пишет в файл пакетами.
         В режиме "errors": буферизует.
         """
         if not self._is_enabled():
             return
 
-        if self._is_immediate_write():
-            self._append_raw_chunk_to_file(chunk)
-        else:
-            # Режим "errors" - буферизуем
-            self._raw_chunks_buffer.extend(chunk)
+        self._raw_chunks_buffer.extend(chunk)
+        if self._is_immediate_write() and len(self._raw_chunks_buffer) >= self._WRITE_BATCH_SIZE:
+            # Режим "all" - сбрасываем накопленный пакет одной записью
+            self._flush_pending_chunks()
 
     def log_modified_chunk(self, chunk: bytes):
         """
         Дописывает модифицированный чанк (клиенту).
         
-        В режиме "all": пишет сразу в файл.
+        В режиме "all": пишет в файл пакетами.
         В режиме "errors": буферизует.
         """
         if not self._is_enabled():
             return
 
-        if self._is_immediate_write():
-            self._append_modified_chunk_to_file(chunk)
-        else:
-            # Режим "errors" - буферизуем
-            self._modified_chunks_buffer.extend(chunk)
+        self._modified_chunks_buffer.extend(chunk)
+        if self._is_immediate_write() and len(self._modified_chunks_buffer) >= self._WRITE_BATCH_SIZE:
+            # Режим "all" - сбрасываем накопленный пакет одной записью
+            self._flush_pending_chunks()
     
     def log_error_info(self, status_code: int, error_message: str = ""):
         """
@@ -264,6 +266,7 @@ class DebugLogger:
         
         # В режиме "all" данные уже записаны, добавляем error_info и логи приложения
         if self._is_immediate_write():
+            self._flush_pending_chunks()
             self.log_error_info(status_code, error_message)
             self._write_app_logs_to_file()
             self._clear_app_logs_buffer()
@@ -326,6 +329,7 @@ class DebugLogger:
             self._clear_buffers()
         elif DEBUG_MODE == "all":
             # В режиме "all" сохраняем логи даже для успешных запросов
+            self._flush_pending_chunks()
             self._write_app_logs_to_file()
             self._clear_app_logs_buffer()
     
@@ -359,6 +363,15 @@ class DebugLogger:
         except Exception as e:
             logger.error(f"[DebugLogger] Error writing kiro_request_body: {e}")
     
+    def _flush_pending_chunks(self):
+        """Сбрасывает накопленные чанки в файлы (режим "all")."""
+        if self._raw_chunks_buffer:
+            self._append_raw_chunk_to_file(self._raw_chunks_buffer)
+            self._raw_chunks_buffer.clear()
+        if self._modified_chunks_buffer:
+            self._append_modified_chunk_to_file(self._modified_chunks_buffer)
+            self._modified_chunks_buffer.clear()
+    
     def _append_raw_chunk_to_file(self, chunk: bytes):
         """Дописывает сырой чанк в файл."""
         try:
@@ -399,5 +412,6 @@ class DebugLogger:
             pass
 
 
-# Глобальный экземпляр
-debug_logger = DebugLogger()
\ No newline at end of file
+# Глобальный экземпляр (None при DEBUG_MODE=off, чтобы горячий путь
+# пропускал вызовы одной проверкой `if debug_logger:`)
+debug_logger = DebugLogger() if DEBUG_MODE in ("errors", "all") else None
\ No newline at end of file
@@ -25,7 +25,11 @@ HTTP 客户端管理器。
 """
 
 import asyncio
-from typing import Optional
+import random
+import ssl
+import time
+from email.utils import parsedate_to_datetime
+from typing import Iterable, Optional
 
 import httpx
 from fastapi import HTTPException
@@ -47,7 +51,6 @@ class GlobalHTTPClientManager:
     def __init__(self):
         """Initialize global client manager."""
         self._client: Optional[httpx.AsyncClient] = None
-        self._lock = asyncio.Lock()
 
     async def get_client(self) -> httpx.AsyncClient:
         """
@@ -55,39 +58,162 @@ class GlobalHTTPClientManager:
 
         Note: Timeout should be set per-request, not here, since the client is reused.
 
+        No lock is taken: check and creation contain no await, so they cannot
+        interleave with another coroutine on the same event loop.
+
         Returns:
             HTTP client instance
         """
-        async with self._lock:
-            if self._client is None or self._client.is_closed:
-                limits = httpx.Limits(
-                    max_connections=100,
-                    max_keepalive_connections=20,
-                    keepalive_expiry=60.0  # Increased from 30.0 for long-running connections
-                )
-
-                self._client = httpx.AsyncClient(
-                    timeout=None,  # Timeout set per-request
-                    follow_redirects=True,
-                    limits=limits,
-                    http2=False
-                )
-                logger.debug("Created new global HTTP client with connection pool")
-
-            return self._client
+        client = self._client
+        if client is not None and not client.is_closed:
+            return client
+
+        limits = httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive,
+            keepalive_expiry=settings.http_keepalive_expiry
+        )
+
+        client = httpx.AsyncClient(
+            timeout=None,  # Timeout set per-request
+            follow_redirects=True,
+            limits=limits,
+            http2=True  # Multiplex concurrent requests to the same host over one connection
+        )
+        self._client = client
+        logger.debug("Created new global HTTP client with connection pool")
+        return client
+
+    async def warmup(self, urls: Iterable[str] = ()) -> None:
+        """
+        Create the client eagerly and pre-open pooled connections.
+
+        Sends a HEAD request to each URL so the TLS handshake happens at
+        startup rather than on the first user request. Failures are logged
+        and ignored.
+
+        Args:
+            urls: Base URLs to pre-connect to
+        """
+        client = await self.get_client()
+        for url in urls:
+            try:
+                await client.head(url, timeout=5.0)
+                logger.debug(f"Pre-connected HTTP pool to {url}")
+            except httpx.HTTPError as e:
+                logger.debug(f"HTTP pool warmup for {url} failed: {e}")
 
     async def close(self) -> None:
         """Close global HTTP client."""
-        async with self._lock:
-            if self._client and not self._client.is_closed:
-                await self._client.aclose()
-                logger.debug("Closed global HTTP client")
+        # Detach first: new callers create a fresh client, in-flight requests
+        # keep the old reference until aclose() completes
+        client, self._client = self._client, None
+        if client is not None and not client.is_closed:
+            await client.aclose()
+            logger.debug("Closed global HTTP client")
 
 
 # Global manager instance
 global_http_client_manager = GlobalHTTPClientManager()
 
 
+def retry_delay(attempt: int) -> float:
+    """
+    Exponential backoff delay with cap and jitter.
+
+    Jitter spreads out retries from concurrent callers that failed together,
+    so they don't hit the rate limit again in lockstep.
+
+    Args:
+        attempt: Zero-based attempt number
+
+    Returns:
+        Delay in seconds
+    """
+    delay = min(settings.max_retry_delay, settings.base_retry_delay * (2 ** attempt))
+    return delay * (1 + random.random() * settings.retry_jitter)
+
+
+def _is_unrecoverable(error: httpx.RequestError) -> bool:
+    """
+    Check whether a request error cannot be fixed by retrying.
+
+    Unsupported URL schemes, redirect loops, undecodable bodies and TLS
+    certificate failures fail the same way on every attempt.
+
+    Args:
+        error: Request error raised by httpx
+
+    Returns:
+        True if the request should fail immediately
+    """
+    if isinstance(error, (httpx.UnsupportedProtocol, httpx.TooManyRedirects, httpx.DecodingError)):
+        return True
+    cause = error.__cause__ or error.__context__
+    while cause is not None:
+        if isinstance(cause, ssl.SSLCertVerificationError):
+            return True
+        cause = cause.__cause__ or cause.__context__
+    return False
+
+
+def is_transient_error(error: Exception) -> bool:
+    """
+    Check whether a failed upstream call is worth retrying.
+
+    Only 429, 5xx and recoverable network errors are transient; other HTTP
+    statuses (401/403 for bad or revoked credentials) fail the same way on
+    every attempt.
+
+    Args:
+        error: Exception raised by the upstream call
+
+    Returns:
+        True if the call may succeed on retry
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        status_code = error.response.status_code
+        return status_code == 429 or 500 <= status_code < 600
+    if isinstance(error, httpx.RequestError):
+        return not _is_unrecoverable(error)
+    return False
+
+
+# Jitter applied on top of a server-provided Retry-After value
+_RETRY_AFTER_JITTER = 0.25
+
+
+def _rate_limit_delay(response: httpx.Response, attempt: int) -> float:
+    """
+    Delay before retrying a 429 response.
+
+    Honors the Retry-After header (delta-seconds or HTTP-date), bounded by
+    max_retry_delay and with a small jitter. Falls back to the regular
+    exponential backoff when the header is missing or unparsable.
+
+    Args:
+        response: 429 response
+        attempt: Zero-based attempt number
+
+    Returns:
+        Delay in seconds
+    """
+    retry_after = response.headers.get("retry-after")
+    if not retry_after:
+        return retry_delay(attempt)
+
+    try:
+        delay = float(retry_after)
+    except ValueError:
+        try:
+            delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return retry_delay(attempt)
+
+    delay = min(max(delay, 0.0), settings.max_retry_delay)
+    return delay * (1 + random.random() * _RETRY_AFTER_JITTER)
+
+
 class KiroHttpClient:
     """
     Kiro API HTTP client with retry logic.
@@ -164,6 +290,7 @@ class KiroHttpClient:
         - 429: Exponential backoff retry
         - 5xx: Exponential backoff retry
         - Timeout: Exponential backoff retry
+        - Unrecoverable errors (TLS certificate, unsupported protocol): fail fast
 
         Args:
             method: HTTP method
@@ -227,16 +354,16 @@ class KiroHttpClient:
 
                 # 429 - Rate limited, wait and retry
                 if response.status_code == 429:
-                    delay = settings.base_retry_delay * (2 ** attempt)
-                    logger.warning(f"Received 429, waiting {delay}s (attempt {attempt + 1}/{max_retries})")
+                    delay = _rate_limit_delay(response, attempt)
+                    logger.warning(f"Received 429, waiting {delay:.2f}s (attempt {attempt + 1}/{max_retries})")
                     await response.aclose()
                     await asyncio.sleep(delay)
                     continue
 
                 # 5xx - Server error, wait and retry
                 if 500 <= response.status_code < 600:
-                    delay = settings.base_retry_delay * (2 ** attempt)
-                    logger.warning(f"Received {response.status_code}, waiting {delay}s (attempt {attempt + 1}/{max_retries})")
+                    delay = retry_delay(attempt)
+                    logger.warning(f"Received {response.status_code}, waiting {delay:.2f}s (attempt {attempt + 1}/{max_retries})")
                     await response.aclose()
                     await asyncio.sleep(delay)
                     continue
@@ -249,14 +376,20 @@ class KiroHttpClient:
                 if stream:
                     logger.warning(f"First token timeout after {timeout}s for model {model} (attempt {attempt + 1}/{max_retries})")
                 else:
-                    delay = settings.base_retry_delay * (2 ** attempt)
-                    logger.warning(f"Timeout after {timeout}s for model {model}, waiting {delay}s (attempt {attempt + 1}/{max_retries})")
+                    delay = retry_delay(attempt)
+                    logger.warning(f"Timeout after {timeout}s for model {model}, waiting {delay:.2f}s (attempt {attempt + 1}/{max_retries})")
                     await asyncio.sleep(delay)
 
             except httpx.RequestError as e:
                 last_error = e
-                delay = settings.base_retry_delay * (2 ** attempt)
-                logger.warning(f"Request error: {e}, waiting {delay}s (attempt {attempt + 1}/{max_retries})")
+                if _is_unrecoverable(e):
+                    logger.error(f"Unrecoverable request error, not retrying: {e}")
+                    raise HTTPException(
+                        status_code=502,
+                        detail=f"请求失败（不可重试）: {e}"
+                    )
+                delay = retry_delay(attempt)
+                logger.warning(f"Request error: {e}, waiting {delay:.2f}s (attempt {attempt + 1}/{max_retries})")
                 await asyncio.sleep(delay)
 
         # All retries failed
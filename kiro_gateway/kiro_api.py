@@ -6,20 +6,71 @@ Kiro API 客户端模块。
 用于调用 Kiro 官方 API 获取账户信息、使用量等数据。
 """
 
+import asyncio
 import cbor2
+import hashlib
 import httpx
+import time
 import uuid
-from typing import Optional, Dict, Any
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, Tuple
 from loguru import logger
 
+from kiro_gateway.config import settings
+from kiro_gateway.http_client import global_http_client_manager, is_transient_error
+
 
 # Kiro API 基础 URL
 KIRO_API_BASE = "https://app.kiro.dev/service/KiroWebPortalService/operation"
 
+# 每次请求都相同的请求头
+_BASE_HEADERS = {
+    "Accept": "application/cbor",
+    "Content-Type": "application/cbor",
+    "smithy-protocol": "rpc-v2-cbor",
+    "amz-sdk-request": "attempt=1; max=1",
+    "x-amz-user-agent": "aws-sdk-js/1.0.0 kiro-gateway/1.0.0",
+}
+
+
+# fetch_token_info 结果缓存: (token 摘要, idp) -> (monotonic 时间, 结果)
+# 使用 blake2b 摘要作为键，避免在内存中保留原始 token
+_token_info_cache: Dict[Tuple[str, str], Tuple[float, Dict[str, Any]]] = {}
+
+# 进行中的 fetch_token_info 请求，同一 key 的并发调用共享一次上游请求
+_token_info_inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+
+class TokenInfoError(Exception):
+    """fetch_token_info 失败；transient 为 True 表示可重试（429、5xx、网络错误）"""
+
+    def __init__(self, message: str, transient: bool):
+        super().__init__(message)
+        self.transient = transient
+
+
+def _token_info_cache_key(access_token: str, idp: str) -> Tuple[str, str]:
+    """生成 token 信息缓存键"""
+    return hashlib.blake2b(access_token.encode(), digest_size=8).hexdigest(), idp
+
 
 def _generate_invocation_id() -> str:
     """生成 AWS SDK 调用 ID"""
-    return str(uuid.uuid4())
+    return uuid.uuid4().hex
+
+
+# client_id 中的标识 -> idp 类型（按顺序匹配）
+_IDP_MARKERS = (("github", "GitHub"), ("google", "Google"))
+
+
+def detect_idp(client_id: Optional[str]) -> str:
+    """根据 client_id 判断 idp 类型，默认 BuilderId"""
+    if client_id:
+        lowered = client_id.lower()
+        for marker, idp in _IDP_MARKERS:
+            if marker in lowered:
+                return idp
+    return "BuilderId"
 
 
 async def kiro_api_request(
@@ -50,40 +101,37 @@ async def kiro_api_request(
     payload = cbor2.dumps(body)
     
     headers = {
-        "Accept": "application/cbor",
-        "Content-Type": "application/cbor",
-        "smithy-protocol": "rpc-v2-cbor",
+        **_BASE_HEADERS,
         "amz-sdk-invocation-id": _generate_invocation_id(),
-        "amz-sdk-request": "attempt=1; max=1",
-        "x-amz-user-agent": "aws-sdk-js/1.0.0 kiro-gateway/1.0.0",
         "Authorization": f"Bearer {access_token}",
         "Cookie": f"Idp={idp}; AccessToken={access_token}"
     }
     
     logger.debug(f"[Kiro API] Calling {operation}")
     
-    async with httpx.AsyncClient(timeout=30) as client:
-        response = await client.post(url, content=payload, headers=headers)
-        
-        if not response.is_success:
-            # 尝试解析 CBOR 错误响应
-            error_msg = f"HTTP {response.status_code}"
-            try:
-                error_data = cbor2.loads(response.content)
-                if isinstance(error_data, dict):
-                    if "__type" in error_data and "message" in error_data:
-                        error_type = error_data["__type"].split("#")[-1]
-                        error_msg = f"{error_type}: {error_data['message']}"
-                    elif "message" in error_data:
-                        error_msg = error_data["message"]
-            except Exception:
-                pass
-            logger.error(f"[Kiro API] {operation} failed: {error_msg}")
-            raise httpx.HTTPStatusError(error_msg, request=response.request, response=response)
-        
-        result = cbor2.loads(response.content)
-        logger.debug(f"[Kiro API] {operation} succeeded")
-        return result
+    # 复用全局连接池，避免每次调用重新建立 TCP/TLS 连接
+    client = await global_http_client_manager.get_client()
+    response = await client.post(url, content=payload, headers=headers, timeout=30.0)
+    
+    if not response.is_success:
+        # 尝试解析 CBOR 错误响应
+        error_msg = f"HTTP {response.status_code}"
+        try:
+            error_data = cbor2.loads(response.content)
+            if isinstance(error_data, dict):
+                if "__type" in error_data and "message" in error_data:
+                    error_type = error_data["__type"].split("#")[-1]
+                    error_msg = f"{error_type}: {error_data['message']}"
+                elif "message" in error_data:
+                    error_msg = error_data["message"]
+        except Exception:
+            pass
+        logger.error(f"[Kiro API] {operation} failed: {error_msg}")
+        raise httpx.HTTPStatusError(error_msg, request=response.request, response=response)
+    
+    result = cbor2.loads(response.content)
+    logger.debug(f"[Kiro API] {operation} succeeded")
+    return result
 
 
 async def get_user_info(access_token: str, idp: str = "BuilderId") -> Dict[str, Any]:
@@ -152,6 +200,31 @@ async def get_user_usage_and_limits(
     )
 
 
+# 订阅标题关键字 -> 订阅类型（按优先级排列）
+_SUBSCRIPTION_TYPES = (
+    ("PRO", "Pro"),
+    ("ENTERPRISE", "Enterprise"),
+    ("TEAMS", "Teams"),
+)
+
+
+def _to_datetime(value: Any) -> Optional[datetime]:
+    """将 datetime 对象或 ISO 字符串转换为 datetime，无法解析时返回 None"""
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def _date_only(value: Any, parsed: Optional[datetime]) -> str:
+    """返回 YYYY-MM-DD 日期字符串，无法解析时截取原始值的前 10 个字符"""
+    if parsed is not None:
+        return parsed.date().isoformat()
+    return str(value)[:10]
+
+
 def parse_usage_response(data: Dict[str, Any]) -> Dict[str, Any]:
     """
     解析 GetUserUsageAndLimits 响应，提取关键信息。
@@ -188,15 +261,12 @@ def parse_usage_response(data: Dict[str, Any]) -> Dict[str, Any]:
     sub_title = sub_info.get("subscriptionTitle", "Free")
     result["subscription_title"] = sub_title
     
-    # 解析订阅类型
-    sub_type = "Free"
-    if "PRO" in sub_title.upper():
-        sub_type = "Pro"
-    elif "ENTERPRISE" in sub_title.upper():
-        sub_type = "Enterprise"
-    elif "TEAMS" in sub_title.upper():
-        sub_type = "Teams"
-    result["subscription_type"] = sub_type
+    # 解析订阅类型（按顺序匹配，只转换一次大写）
+    upper_title = sub_title.upper()
+    result["subscription_type"] = next(
+        (sub_type for keyword, sub_type in _SUBSCRIPTION_TYPES if keyword in upper_title),
+        "Free"
+    )
     
     result["upgrade_capability"] = sub_info.get("upgradeCapability")
     result["overage_capability"] = sub_info.get("overageCapability")
@@ -204,11 +274,13 @@ def parse_usage_response(data: Dict[str, Any]) -> Dict[str, Any]:
     
     # 使用量信息
     usage_list = data.get("usageBreakdownList", [])
-    credit_usage = None
+    # 按 resourceType 建立索引（同类型保留第一个），旧响应回退到 displayName 匹配
+    by_type: Dict[str, Dict[str, Any]] = {}
     for item in usage_list:
-        if item.get("resourceType") == "CREDIT" or item.get("displayName") == "Credits":
-            credit_usage = item
-            break
+        by_type.setdefault(item.get("resourceType"), item)
+    credit_usage = by_type.get("CREDIT") or next(
+        (item for item in usage_list if item.get("displayName") == "Credits"), None
+    )
     
     if credit_usage:
         # 基础额度（优先使用精确小数）
@@ -228,24 +300,17 @@ def parse_usage_response(data: Dict[str, Any]) -> Dict[str, Any]:
             trial_expiry = trial_info.get("freeTrialExpiry")
         result["trial_limit"] = trial_limit
         result["trial_current"] = trial_current
-        # trial_expiry 可能是 datetime 对象或字符串
-        if trial_expiry:
-            if hasattr(trial_expiry, 'isoformat'):
-                trial_expiry = trial_expiry.isoformat()
-            result["trial_expiry"] = str(trial_expiry)[:10]  # 只保留日期部分
-        else:
-            result["trial_expiry"] = None
+        # trial_expiry 可能是 datetime 对象或字符串，只保留日期部分
+        result["trial_expiry"] = _date_only(trial_expiry, _to_datetime(trial_expiry)) if trial_expiry else None
         
-        # 奖励额度
-        bonuses = credit_usage.get("bonuses", [])
-        bonus_limit = sum(
-            b.get("usageLimitWithPrecision") or b.get("usageLimit", 0)
-            for b in bonuses if b.get("status") == "ACTIVE"
-        )
-        bonus_current = sum(
-            b.get("currentUsageWithPrecision") or b.get("currentUsage", 0)
-            for b in bonuses if b.get("status") == "ACTIVE"
-        )
+        # 奖励额度（单次遍历同时累计额度和使用量）
+        bonus_limit = 0
+        bonus_current = 0
+        for b in credit_usage.get("bonuses", []):
+            if b.get("status") != "ACTIVE":
+                continue
+            bonus_limit += b.get("usageLimitWithPrecision") or b.get("usageLimit", 0)
+            bonus_current += b.get("currentUsageWithPrecision") or b.get("currentUsage", 0)
         result["bonus_limit"] = bonus_limit
         result["bonus_current"] = bonus_current
         
@@ -263,67 +328,101 @@ def parse_usage_response(data: Dict[str, Any]) -> Dict[str, Any]:
         result["usage_limit"] = 0
         result["usage_current"] = 0
     
-    # 重置日期
+    # 重置日期（只解析一次，日期字符串和剩余天数都从同一个 datetime 得出）
     next_reset = data.get("nextDateReset")
-    # next_reset 可能是 datetime 对象或字符串
-    if next_reset:
-        if hasattr(next_reset, 'isoformat'):
-            next_reset_str = next_reset.isoformat()
-        else:
-            next_reset_str = str(next_reset)
-        result["next_reset"] = next_reset_str[:10]  # 只保留日期部分
-    else:
-        result["next_reset"] = None
+    reset_date = _to_datetime(next_reset) if next_reset else None
+    result["next_reset"] = _date_only(next_reset, reset_date) if next_reset else None
     
     # 计算剩余天数
-    if next_reset:
-        from datetime import datetime, timezone
-        try:
-            # next_reset 可能已经是 datetime 对象
-            if hasattr(next_reset, 'tzinfo'):
-                reset_date = next_reset
-            else:
-                next_reset_str = str(next_reset)
-                reset_date = datetime.fromisoformat(next_reset_str.replace("Z", "+00:00"))
-            
-            if reset_date.tzinfo:
-                now = datetime.now(reset_date.tzinfo)
-            else:
-                now = datetime.now(timezone.utc)
-                reset_date = reset_date.replace(tzinfo=timezone.utc)
-            
-            days = (reset_date - now).days
-            result["days_remaining"] = max(0, days)
-        except Exception as e:
-            logger.warning(f"[Kiro API] Failed to parse reset date: {e}")
-            result["days_remaining"] = None
+    if reset_date is not None:
+        if reset_date.tzinfo:
+            now = datetime.now(reset_date.tzinfo)
+        else:
+            now = datetime.now(timezone.utc)
+            reset_date = reset_date.replace(tzinfo=timezone.utc)
+        result["days_remaining"] = max(0, (reset_date - now).days)
     else:
+        if next_reset:
+            logger.warning(f"[Kiro API] Failed to parse reset date: {next_reset!r}")
         result["days_remaining"] = None
     
     return result
 
 
+async def _fetch_token_info_uncached(
+    access_token: str,
+    idp: str,
+    key: Tuple[str, str],
+    ttl: float
+) -> Optional[Dict[str, Any]]:
+    """请求 Kiro API 并解析账户信息，成功时写入缓存"""
+    try:
+        data = await get_user_usage_and_limits(access_token, idp)
+        result = parse_usage_response(data)
+        result["idp"] = idp
+        if ttl > 0:
+            now = time.monotonic()
+            # 清理过期条目，防止缓存无限增长
+            for stale_key in [k for k, (ts, _) in _token_info_cache.items() if now - ts >= ttl]:
+                del _token_info_cache[stale_key]
+            _token_info_cache[key] = (now, result)
+        return result
+    except Exception as e:
+        logger.error(f"[Kiro API] Failed to fetch token info: {e}")
+        raise TokenInfoError(str(e), transient=is_transient_error(e)) from e
+
+
+def _clear_inflight(key: Tuple[str, str], future: asyncio.Future) -> None:
+    """移除已完成的进行中请求；读取其异常，避免所有等待者都被取消时出现 never retrieved 警告"""
+    _token_info_inflight.pop(key, None)
+    if not future.cancelled():
+        future.exception()
+
+
 async def fetch_token_info(
     access_token: str,
-    idp: str = "BuilderId"
+    idp: str = "BuilderId",
+    raise_on_error: bool = False
 ) -> Optional[Dict[str, Any]]:
     """
     获取并解析 Token 的完整账户信息。
     
     这是一个便捷函数，组合调用 API 并解析返回数据。
+    成功结果按 (token, idp) 缓存 settings.token_info_ttl 秒，
+    在此期间的重复轮询不会再请求 Kiro API；同一 key 的并发调用
+    共享同一个进行中的请求。
     
     Args:
         access_token: 访问令牌
         idp: 身份提供商
+        raise_on_error: 失败时抛出 TokenInfoError 而不是返回 None，
+            调用方可据此区分临时性失败与凭证失效
         
     Returns:
         解析后的账户信息 dict，失败返回 None
+        
+    Raises:
+        TokenInfoError: raise_on_error 为 True 且请求失败
     """
+    ttl = settings.token_info_ttl
+    key = _token_info_cache_key(access_token, idp)
+    if ttl > 0:
+        entry = _token_info_cache.get(key)
+        if entry and time.monotonic() - entry[0] < ttl:
+            return dict(entry[1])
+    
+    inflight = _token_info_inflight.get(key)
+    if inflight is None:
+        inflight = asyncio.ensure_future(_fetch_token_info_uncached(access_token, idp, key, ttl))
+        _token_info_inflight[key] = inflight
+        inflight.add_done_callback(lambda f: _clear_inflight(key, f))
+    
+    # shield: 某个调用方被取消时不影响其他等待者
     try:
-        data = await get_user_usage_and_limits(access_token, idp)
-        result = parse_usage_response(data)
-        result["idp"] = idp
-        return result
-    except Exception as e:
-        logger.error(f"[Kiro API] Failed to fetch token info: {e}")
+        result = await asyncio.shield(inflight)
+    except TokenInfoError:
+        if raise_on_error:
+            raise
         return None
+    # 每个调用方拿到独立副本，避免修改共享/缓存中的结果
+    return dict(result)
@@ -23,19 +23,27 @@ Prometheus metrics module.
 Provides structured application metrics collection and export.
 """
 
+import atexit
 import os
 import sqlite3
 import time
+from array import array
+from bisect import bisect_left
 from collections import defaultdict
-from typing import Dict, List, Tuple
+from itertools import accumulate
+from typing import Dict, List, Tuple, Union
 from dataclasses import dataclass
-from threading import Lock
+from threading import Event, Lock, Thread
 
 from loguru import logger
 
 from kiro_gateway.config import APP_VERSION, settings
 
 METRICS_DB_FILE = os.getenv("METRICS_DB_FILE", "data/metrics.db")
+METRICS_CACHE_TTL_SECONDS = float(os.getenv("METRICS_CACHE_TTL_SECONDS", "1.0"))
+
+# (endpoint, status_code, model); status stays a str only for unparsable persisted keys
+RequestKey = Tuple[str, Union[int, str], str]
 
 
 @dataclass
@@ -58,8 +66,8 @@ class PrometheusMetrics:
     - Error count
     """
 
-    # Latency histogram bucket boundaries (seconds)
-    LATENCY_BUCKETS = [0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, float('inf')]
+    # Latency histogram bucket boundaries (seconds), sorted for bisect
+    LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, float('inf'))
     MAX_RECENT_REQUESTS = 50
     MAX_RESPONSE_TIMES = 100
 
@@ -70,21 +78,34 @@ class PrometheusMetrics:
         self._init_db()
 
         # Counters
-        self._request_total: Dict[str, int] = defaultdict(int)  # {endpoint:status:model: count}
+        self._request_total: Dict[RequestKey, int] = defaultdict(int)  # {(endpoint, status, model): count}
         self._error_total: Dict[str, int] = defaultdict(int)  # {error_type: count}
         self._retry_total: Dict[str, int] = defaultdict(int)  # {endpoint: count}
 
         # Token counters
         self._input_tokens_total: Dict[str, int] = defaultdict(int)  # {model: tokens}
         self._output_tokens_total: Dict[str, int] = defaultdict(int)  # {model: tokens}
+        self._total_input_tokens = 0  # running sum over all models
+        self._total_output_tokens = 0  # running sum over all models
 
         # Histograms
-        self._latency_histogram: Dict[str, List[int]] = defaultdict(
-            lambda: [0] * len(self.LATENCY_BUCKETS)
-        )  # {endpoint: [bucket_counts]}
+        zeros = (0,) * len(self.LATENCY_BUCKETS)
+        self._latency_histogram: Dict[str, array] = defaultdict(
+            lambda: array('Q', zeros)
+        )  # {endpoint: contiguous uint64 per-bucket counts}, made cumulative at export time
         self._latency_sum: Dict[str, float] = defaultdict(float)  # {endpoint: sum}
         self._latency_count: Dict[str, int] = defaultdict(int)  # {endpoint: count}
 
+        # Prometheus label prefixes, built once per label set and reused on every scrape
+        self._request_line_prefix: Dict[RequestKey, str] = {}
+        self._latency_line_prefixes: Dict[str, Tuple[Tuple[str, ...], str, str]] = {}
+
+        # Bumped on every write that get_metrics/export_prometheus report;
+        # lets repeated reads reuse the last built output
+        self._version = 0
+        self._metrics_cache: Tuple[int, float, Dict] = (-1, 0.0, {})  # (version, built_at, metrics)
+        self._prometheus_cache: Tuple[int, float, str] = (-1, 0.0, "")  # (version, built_at, body)
+
         # Gauges
         self._active_connections = 0
         self._cache_size = 0
@@ -109,9 +130,21 @@ class PrometheusMetrics:
         self._self_use_enabled: bool = False  # Self-use mode toggle
         self._proxy_api_key: str = settings.proxy_api_key
 
+        # Write-behind queue: hot-path updates record the latest value per key
+        # under self._lock, a background thread persists them to SQLite
+        self._pending_counters: Dict[str, int] = {}
+        self._pending_hourly: Dict[int, int] = {}
+        self._pending_ips: Dict[str, Tuple[int, int]] = {}  # {ip: (count, last_seen)}
+        self._pending_recent: List[Dict] = []
+        self._flush_lock = Lock()  # keeps flushes ordered, so stored values never go backwards
+        self._write_event = Event()
+
         # Load persisted data
         self._load_from_db()
 
+        Thread(target=self._writer_loop, name="metrics-writer", daemon=True).start()
+        atexit.register(self.flush)
+
     def _init_db(self) -> None:
         """Initialize SQLite database and create tables."""
         os.makedirs(os.path.dirname(self._db_path) or ".", exist_ok=True)
@@ -160,7 +193,7 @@ class PrometheusMetrics:
                 cursor = conn.execute("SELECT key, value FROM counters")
                 for key, value in cursor:
                     if key.startswith("req:"):
-                        self._request_total[key[4:]] = value
+                        self._request_total[self._split_request_key(key[4:])] = value
                     elif key.startswith("err:"):
                         self._error_total[key[4:]] = value
                     elif key.startswith("retry:"):
@@ -169,8 +202,10 @@ class PrometheusMetrics:
                         self._api_type_usage[key[4:]] = value
                     elif key.startswith("in_tok:"):
                         self._input_tokens_total[key[7:]] = value
+                        self._total_input_tokens += value
                     elif key.startswith("out_tok:"):
                         self._output_tokens_total[key[8:]] = value
+                        self._total_output_tokens += value
                     elif key == "stream_requests":
                         self._stream_requests = value
                     elif key == "non_stream_requests":
@@ -225,50 +260,75 @@ class PrometheusMetrics:
             logger.warning(f"Failed to load metrics from DB: {e}")
 
     def _save_counter(self, key: str, value: int) -> None:
-        """Save a single counter to database."""
-        try:
-            with sqlite3.connect(self._db_path) as conn:
-                conn.execute(
-                    "INSERT OR REPLACE INTO counters (key, value) VALUES (?, ?)",
-                    (key, value)
-                )
-                conn.commit()
-        except Exception as e:
-            logger.debug(f"Failed to save counter: {e}")
+        """Queue a counter value for the background writer (caller holds self._lock)."""
+        self._pending_counters[key] = value
+        self._write_event.set()
 
     def _save_hourly(self, hour_ts: int, count: int) -> None:
-        """Save hourly request count."""
-        try:
-            with sqlite3.connect(self._db_path) as conn:
-                conn.execute(
-                    "INSERT OR REPLACE INTO hourly_requests (hour_ts, count) VALUES (?, ?)",
-                    (hour_ts, count)
-                )
-                # Clean old data (> 24h)
-                cutoff = hour_ts - 24 * 3600000
-                conn.execute("DELETE FROM hourly_requests WHERE hour_ts < ?", (cutoff,))
-                conn.commit()
-        except Exception as e:
-            logger.debug(f"Failed to save hourly: {e}")
+        """Queue an hourly request count for the background writer (caller holds self._lock)."""
+        self._pending_hourly[hour_ts] = count
+        self._write_event.set()
 
     def _save_recent_request(self, req: Dict) -> None:
-        """Save a recent request to database."""
-        try:
-            with sqlite3.connect(self._db_path) as conn:
-                conn.execute(
-                    "INSERT INTO recent_requests (timestamp, api_type, path, status, duration, model) "
-                    "VALUES (?, ?, ?, ?, ?, ?)",
-                    (req["timestamp"], req["apiType"], req["path"],
-                     req["status"], req["duration"], req["model"])
-                )
-                # Keep only last 100 records
-                conn.execute(
-                    "DELETE FROM recent_requests WHERE id NOT IN "
-                    "(SELECT id FROM recent_requests ORDER BY id DESC LIMIT 100)"
-                )
-                conn.commit()
-        except Exception as e:
-            logger.debug(f"Failed to save recent request: {e}")
+        """Queue a recent request for the background writer (caller holds self._lock)."""
+        self._pending_recent.append(req)
+        self._write_event.set()
+
+    def _writer_loop(self) -> None:
+        """Persist queued values whenever new ones arrive."""
+        while True:
+            self._write_event.wait()
+            self._write_event.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        """Write all queued counters, hourly counts, IP stats and recent requests to SQLite."""
+        with self._flush_lock:
+            with self._lock:
+                counters, self._pending_counters = self._pending_counters, {}
+                hourly, self._pending_hourly = self._pending_hourly, {}
+                ips, self._pending_ips = self._pending_ips, {}
+                recent, self._pending_recent = self._pending_recent, []
+            if not (counters or hourly or ips or recent):
+                return
+            try:
+                with sqlite3.connect(self._db_path) as conn:
+                    if counters:
+                        conn.executemany(
+                            "INSERT OR REPLACE INTO counters (key, value) VALUES (?, ?)",
+                            counters.items()
+                        )
+                    if hourly:
+                        conn.executemany(
+                            "INSERT OR REPLACE INTO hourly_requests (hour_ts, count) VALUES (?, ?)",
+                            hourly.items()
+                        )
+                        # Clean old data (> 24h)
+                        cutoff = max(hourly) - 24 * 3600000
+                        conn.execute("DELETE FROM hourly_requests WHERE hour_ts < ?", (cutoff,))
+                    if ips:
+                        conn.executemany(
+                            "INSERT OR REPLACE INTO ip_stats (ip, count, last_seen) VALUES (?, ?, ?)",
+                            [(ip, count, last_seen) for ip, (count, last_seen) in ips.items()]
+                        )
+                    if recent:
+                        conn.executemany(
+                            "INSERT INTO recent_requests (timestamp, api_type, path, status, duration, model) "
+                            "VALUES (?, ?, ?, ?, ?, ?)",
+                            [
+                                (req["timestamp"], req["apiType"], req["path"],
+                                 req["status"], req["duration"], req["model"])
+                                for req in recent
+                            ]
+                        )
+                        # Keep only last 100 records
+                        conn.execute(
+                            "DELETE FROM recent_requests WHERE id NOT IN "
+                            "(SELECT id FROM recent_requests ORDER BY id DESC LIMIT 100)"
+                        )
+                    conn.commit()
+            except Exception as e:
+                logger.debug(f"Failed to save metrics: {e}")
 
     def inc_request(self, endpoint: str, status_code: int, model: str = "unknown") -> None:
         """
@@ -279,13 +339,14 @@ class PrometheusMetrics:
             status_code: HTTP status code
             model: Model name
         """
+        key = (endpoint, status_code, model)
         with self._lock:
-            key = f"{endpoint}:{status_code}:{model}"
+            self._version += 1
             self._request_total[key] += 1
-            self._save_counter(f"req:{key}", self._request_total[key])
+            self._save_counter(f"req:{endpoint}:{status_code}:{model}", self._request_total[key])
 
-    def _split_request_key(self, key: str) -> Tuple[str, str, str]:
-        """Split request key safely, allowing ':' in endpoints."""
+    def _split_request_key(self, key: str) -> RequestKey:
+        """Split a persisted 'endpoint:status:model' key, allowing ':' in endpoints."""
         parts = key.rsplit(":", 2)
         if len(parts) == 3:
             endpoint, status, model = parts
@@ -294,16 +355,15 @@ class PrometheusMetrics:
             model = "unknown"
         else:
             endpoint, status, model = key, "unknown", "unknown"
-        return endpoint, status, model
-
-    def _is_success_status(self, key: str) -> bool:
-        """Check if request key has a successful HTTP status."""
-        _endpoint, status_str, _model = self._split_request_key(key)
         try:
-            status = int(status_str)
+            return endpoint, int(status), model
         except ValueError:
-            return False
-        return 200 <= status < 400
+            return endpoint, status, model
+
+    @staticmethod
+    def _is_success_status(status: Union[int, str]) -> bool:
+        """Check if a request status is a successful HTTP status."""
+        return isinstance(status, int) and 200 <= status < 400
 
     def inc_error(self, error_type: str) -> None:
         """
@@ -313,6 +373,7 @@ class PrometheusMetrics:
             error_type: Error type
         """
         with self._lock:
+            self._version += 1
             self._error_total[error_type] += 1
             self._save_counter(f"err:{error_type}", self._error_total[error_type])
 
@@ -324,6 +385,7 @@ class PrometheusMetrics:
             endpoint: API endpoint
         """
         with self._lock:
+            self._version += 1
             self._retry_total[endpoint] += 1
             self._save_counter(f"retry:{endpoint}", self._retry_total[endpoint])
 
@@ -336,10 +398,9 @@ class PrometheusMetrics:
             latency: Latency in seconds
         """
         with self._lock:
-            # Update histogram buckets
-            for i, le in enumerate(self.LATENCY_BUCKETS):
-                if latency <= le:
-                    self._latency_histogram[endpoint][i] += 1
+            self._version += 1
+            # Update the single bucket the observation falls into
+            self._latency_histogram[endpoint][bisect_left(self.LATENCY_BUCKETS, latency)] += 1
 
             # Update sum and count
             self._latency_sum[endpoint] += latency
@@ -355,34 +416,45 @@ class PrometheusMetrics:
             output_tokens: Output token count
         """
         with self._lock:
+            self._version += 1
             self._input_tokens_total[model] += input_tokens
             self._output_tokens_total[model] += output_tokens
+            self._total_input_tokens += input_tokens
+            self._total_output_tokens += output_tokens
             self._save_counter(f"in_tok:{model}", self._input_tokens_total[model])
             self._save_counter(f"out_tok:{model}", self._output_tokens_total[model])
 
     def set_active_connections(self, count: int) -> None:
         """Set active connection count."""
         with self._lock:
+            self._version += 1
             self._active_connections = count
 
     def inc_active_connections(self) -> None:
-        """Increment active connection count."""
-        with self._lock:
-            self._active_connections += 1
+        """
+        Increment active connection count.
+
+        Lock-free: only called from MetricsMiddleware on the event loop thread,
+        so there is no concurrent writer for this gauge.
+        """
+        self._version += 1
+        self._active_connections += 1
 
     def dec_active_connections(self) -> None:
-        """Decrement active connection count."""
-        with self._lock:
-            self._active_connections = max(0, self._active_connections - 1)
+        """Decrement active connection count (lock-free, see inc_active_connections)."""
+        self._version += 1
+        self._active_connections = max(0, self._active_connections - 1)
 
     def set_cache_size(self, size: int) -> None:
         """Set cache size."""
         with self._lock:
+            self._version += 1
             self._cache_size = size
 
     def set_token_valid(self, valid: bool) -> None:
         """Set token validity status."""
         with self._lock:
+            self._version += 1
             self._token_valid = valid
 
     def record_request(
@@ -405,6 +477,17 @@ class PrometheusMetrics:
             is_stream: Whether streaming request
             api_type: API type (openai/anthropic)
         """
+        now = int(time.time() * 1000)
+        req = {
+            "timestamp": now,
+            "apiType": api_type,
+            "path": endpoint,
+            "status": status_code,
+            "duration": duration_ms,
+            "model": model
+        }
+        hour_ts = (now // 3600000) * 3600000
+
         with self._lock:
             # Increment stream/non-stream counters
             if is_stream:
@@ -424,22 +507,12 @@ class PrometheusMetrics:
                 self._response_times.pop(0)
 
             # Add to recent requests (keep last N)
-            now = int(time.time() * 1000)
-            req = {
-                "timestamp": now,
-                "apiType": api_type,
-                "path": endpoint,
-                "status": status_code,
-                "duration": duration_ms,
-                "model": model
-            }
             self._recent_requests.append(req)
             if len(self._recent_requests) > self.MAX_RECENT_REQUESTS:
                 self._recent_requests.pop(0)
             self._save_recent_request(req)
 
             # Track hourly requests
-            hour_ts = (now // 3600000) * 3600000
             self._hourly_requests[hour_ts] += 1
             self._save_hourly(hour_ts, self._hourly_requests[hour_ts])
             # Clean up old hourly data (keep only last 24 hours)
@@ -462,14 +535,8 @@ class PrometheusMetrics:
             success_requests = 0
             failed_requests = 0
 
-            for key, count in self._request_total.items():
-                _endpoint, status_str, _model = self._split_request_key(key)
-                try:
-                    status = int(status_str)
-                except ValueError:
-                    failed_requests += count
-                    continue
-                if 200 <= status < 400:
+            for (_endpoint, status, _model), count in self._request_total.items():
+                if self._is_success_status(status):
                     success_requests += count
                 else:
                     failed_requests += count
@@ -487,8 +554,7 @@ class PrometheusMetrics:
                     model_usage[model] = model_usage.get(model, 0) + 1
             # Fallback to _request_total if no recent requests
             if not model_usage:
-                for key, count in self._request_total.items():
-                    _endpoint, _status, model = self._split_request_key(key)
+                for (_endpoint, _status, model), count in self._request_total.items():
                     if model != "unknown":
                         model_usage[model] = model_usage.get(model, 0) + count
 
@@ -525,101 +591,147 @@ class PrometheusMetrics:
         Returns:
             Metrics dictionary
         """
+        cached_version, built_at, cached = self._metrics_cache
+        if cached_version == self._version or time.monotonic() - built_at < METRICS_CACHE_TTL_SECONDS:
+            return {**cached, "uptime_seconds": round(time.time() - self._start_time, 2)}
+
+        # Snapshot under the lock; percentiles and aggregation run outside it
         with self._lock:
-            # Calculate average latency and percentiles
-            latency_stats = {}
-            for endpoint, counts in self._latency_histogram.items():
-                total_count = self._latency_count[endpoint]
-                if total_count > 0:
-                    avg = self._latency_sum[endpoint] / total_count
-
-                    # Calculate P50, P95, P99
-                    p50 = self._calculate_percentile(counts, total_count, 0.50)
-                    p95 = self._calculate_percentile(counts, total_count, 0.95)
-                    p99 = self._calculate_percentile(counts, total_count, 0.99)
-
-                    latency_stats[endpoint] = {
-                        "avg": round(avg, 4),
-                        "p50": round(p50, 4),
-                        "p95": round(p95, 4),
-                        "p99": round(p99, 4),
-                        "count": total_count
-                    }
+            version = self._version
+            request_total = list(self._request_total.items())
+            error_total = dict(self._error_total)
+            retry_total = dict(self._retry_total)
+            input_tokens_total = dict(self._input_tokens_total)
+            output_tokens_total = dict(self._output_tokens_total)
+            total_input_tokens = self._total_input_tokens
+            total_output_tokens = self._total_output_tokens
+            latency_histogram = [
+                (endpoint, list(counts), self._latency_sum[endpoint], self._latency_count[endpoint])
+                for endpoint, counts in self._latency_histogram.items()
+            ]
+            gauges = {
+                "active_connections": self._active_connections,
+                "cache_size": self._cache_size,
+                "token_valid": self._token_valid
+            }
 
-            return {
-                "version": APP_VERSION,
-                "uptime_seconds": round(time.time() - self._start_time, 2),
-                "requests": {
-                    "total": dict(self._request_total),
-                    "by_endpoint": self._aggregate_by_endpoint(),
-                    "by_status": self._aggregate_by_status(),
-                    "by_model": self._aggregate_by_model()
-                },
-                "errors": dict(self._error_total),
-                "retries": dict(self._retry_total),
-                "latency": latency_stats,
-                "tokens": {
-                    "input": dict(self._input_tokens_total),
-                    "output": dict(self._output_tokens_total),
-                    "total_input": sum(self._input_tokens_total.values()),
-                    "total_output": sum(self._output_tokens_total.values())
-                },
-                "gauges": {
-                    "active_connections": self._active_connections,
-                    "cache_size": self._cache_size,
-                    "token_valid": self._token_valid
+        # Calculate average latency and percentiles
+        latency_stats = {}
+        for endpoint, counts, latency_sum, total_count in latency_histogram:
+            if total_count > 0:
+                avg = latency_sum / total_count
+
+                # Calculate P50, P95, P99 in one pass over the buckets
+                p50, p95, p99 = self._calculate_percentiles(counts, total_count, (0.50, 0.95, 0.99))
+
+                latency_stats[endpoint] = {
+                    "avg": round(avg, 4),
+                    "p50": round(p50, 4),
+                    "p95": round(p95, 4),
+                    "p99": round(p99, 4),
+                    "count": total_count
                 }
-            }
 
-    def _calculate_percentile(self, bucket_counts: List[int], total: int, percentile: float) -> float:
+        # Total and per-endpoint/status/model breakdowns in one pass
+        total, by_endpoint, by_status, by_model = self._aggregate_requests(request_total)
+
+        result = {
+            "version": APP_VERSION,
+            "uptime_seconds": round(time.time() - self._start_time, 2),
+            "requests": {
+                "total": total,
+                "by_endpoint": by_endpoint,
+                "by_status": by_status,
+                "by_model": by_model
+            },
+            "errors": error_total,
+            "retries": retry_total,
+            "latency": latency_stats,
+            "tokens": {
+                "input": input_tokens_total,
+                "output": output_tokens_total,
+                "total_input": total_input_tokens,
+                "total_output": total_output_tokens
+            },
+            "gauges": gauges
+        }
+        self._metrics_cache = (version, time.monotonic(), result)
+        return result
+
+    def _calculate_percentiles(
+        self,
+        bucket_counts: List[int],
+        total: int,
+        percentiles: Tuple[float, ...]
+    ) -> List[float]:
         """
-        Calculate percentile from histogram buckets.
+        Calculate several percentiles from histogram buckets in a single pass.
 
         Args:
-            bucket_counts: Bucket count list
+            bucket_counts: Per-bucket count list
             total: Total count
-            percentile: Percentile (0-1)
+            percentiles: Percentiles (0-1), in ascending order
 
         Returns:
-            Estimated percentile value
+            Estimated percentile values, in the same order as percentiles
         """
         if total == 0:
-            return 0.0
+            return [0.0] * len(percentiles)
 
-        target = total * percentile
+        results: List[float] = []
         cumulative = 0
+        i = 0
 
-        for i, count in enumerate(bucket_counts):
+        for count, le in zip(bucket_counts, self.LATENCY_BUCKETS):
             cumulative += count
-            if cumulative >= target:
-                # Return bucket upper bound as estimate
-                return self.LATENCY_BUCKETS[i] if self.LATENCY_BUCKETS[i] != float('inf') else 120.0
-
-        return self.LATENCY_BUCKETS[-2]  # Return last finite bucket
-
-    def _aggregate_by_endpoint(self) -> Dict[str, int]:
-        """Aggregate request count by endpoint."""
-        result = defaultdict(int)
-        for key, count in self._request_total.items():
-            endpoint, _status, _model = self._split_request_key(key)
-            result[endpoint] += count
-        return dict(result)
-
-    def _aggregate_by_status(self) -> Dict[str, int]:
-        """Aggregate request count by status code."""
-        result = defaultdict(int)
-        for key, count in self._request_total.items():
-            _endpoint, status, _model = self._split_request_key(key)
-            result[status] += count
-        return dict(result)
-
-    def _aggregate_by_model(self) -> Dict[str, int]:
-        """Aggregate request count by model."""
-        result = defaultdict(int)
-        for key, count in self._request_total.items():
-            _endpoint, _status, model = self._split_request_key(key)
-            result[model] += count
-        return dict(result)
+            # Return bucket upper bound as estimate
+            while i < len(percentiles) and cumulative >= total * percentiles[i]:
+                results.append(le if le != float('inf') else 120.0)
+                i += 1
+            if i == len(percentiles):
+                return results
+
+        # Return last finite bucket for anything not reached
+        results.extend([self.LATENCY_BUCKETS[-2]] * (len(percentiles) - i))
+        return results
+
+    def _aggregate_requests(
+        self,
+        request_total: List[Tuple[RequestKey, int]]
+    ) -> Tuple[Dict[str, int], Dict[str, int], Dict[str, int], Dict[str, int]]:
+        """
+        Aggregate request counts in a single pass.
+
+        Returns:
+            (total by "endpoint:status:model", by endpoint, by status code, by model)
+        """
+        total = {}
+        by_endpoint = defaultdict(int)
+        by_status = defaultdict(int)
+        by_model = defaultdict(int)
+        for (endpoint, status, model), count in request_total:
+            total[f"{endpoint}:{status}:{model}"] = count
+            by_endpoint[endpoint] += count
+            by_status[str(status)] += count
+            by_model[model] += count
+        return total, dict(by_endpoint), dict(by_status), dict(by_model)
+
+    def _latency_prefixes(self, endpoint: str) -> Tuple[Tuple[str, ...], str, str]:
+        """Return cached bucket/sum/count line prefixes for an endpoint's histogram."""
+        prefixes = self._latency_line_prefixes.get(endpoint)
+        if prefixes is None:
+            bucket_prefixes = tuple(
+                f'kirogate_request_duration_seconds_bucket{{endpoint="{endpoint}",'
+                f'le="{"+Inf" if le == float("inf") else le}"}} '
+                for le in self.LATENCY_BUCKETS
+            )
+            prefixes = (
+                bucket_prefixes,
+                f'kirogate_request_duration_seconds_sum{{endpoint="{endpoint}"}} ',
+                f'kirogate_request_duration_seconds_count{{endpoint="{endpoint}"}} ',
+            )
+            self._latency_line_prefixes[endpoint] = prefixes
+        return prefixes
 
     def export_prometheus(self) -> str:
         """
@@ -628,80 +740,99 @@ class PrometheusMetrics:
         Returns:
             Prometheus text format metrics
         """
-        lines = []
+        cached_version, built_at, cached_body = self._prometheus_cache
+        if cached_version == self._version or time.monotonic() - built_at < METRICS_CACHE_TTL_SECONDS:
+            return self._with_uptime(cached_body)
 
+        # Snapshot under the lock, format outside it so a slow scrape
+        # doesn't hold up request-path updates
         with self._lock:
-            # Info metric with version
-            lines.append("# HELP kirogate_info KiroGate version information")
-            lines.append("# TYPE kirogate_info gauge")
-            lines.append(f'kirogate_info{{version="{APP_VERSION}"}} 1')
-
-            # Total requests
-            lines.append("# HELP kirogate_requests_total Total number of requests")
-            lines.append("# TYPE kirogate_requests_total counter")
-            for key, count in self._request_total.items():
-                endpoint, status, model = self._split_request_key(key)
-                lines.append(
-                    f'kirogate_requests_total{{endpoint="{endpoint}",status="{status}",model="{model}"}} {count}'
-                )
-
-            # Total errors
-            lines.append("# HELP kirogate_errors_total Total number of errors")
-            lines.append("# TYPE kirogate_errors_total counter")
-            for error_type, count in self._error_total.items():
-                lines.append(f'kirogate_errors_total{{type="{error_type}"}} {count}')
-
-            # Total retries
-            lines.append("# HELP kirogate_retries_total Total number of retries")
-            lines.append("# TYPE kirogate_retries_total counter")
-            for endpoint, count in self._retry_total.items():
-                lines.append(f'kirogate_retries_total{{endpoint="{endpoint}"}} {count}')
-
-            # Token usage
-            lines.append("# HELP kirogate_tokens_total Total tokens used")
-            lines.append("# TYPE kirogate_tokens_total counter")
-            for model, tokens in self._input_tokens_total.items():
-                lines.append(f'kirogate_tokens_total{{model="{model}",type="input"}} {tokens}')
-            for model, tokens in self._output_tokens_total.items():
-                lines.append(f'kirogate_tokens_total{{model="{model}",type="output"}} {tokens}')
-
-            # Latency histogram
-            lines.append("# HELP kirogate_request_duration_seconds Request duration histogram")
-            lines.append("# TYPE kirogate_request_duration_seconds histogram")
-            for endpoint, counts in self._latency_histogram.items():
-                cumulative = 0
-                for i, count in enumerate(counts):
-                    cumulative += count
-                    le = self.LATENCY_BUCKETS[i]
-                    le_str = "+Inf" if le == float('inf') else str(le)
-                    lines.append(
-                        f'kirogate_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{le_str}"}} {cumulative}'
-                    )
-                lines.append(
-                    f'kirogate_request_duration_seconds_sum{{endpoint="{endpoint}"}} {self._latency_sum[endpoint]}'
-                )
-                lines.append(
-                    f'kirogate_request_duration_seconds_count{{endpoint="{endpoint}"}} {self._latency_count[endpoint]}'
-                )
-
-            # Gauges
-            lines.append("# HELP kirogate_active_connections Current active connections")
-            lines.append("# TYPE kirogate_active_connections gauge")
-            lines.append(f"kirogate_active_connections {self._active_connections}")
-
-            lines.append("# HELP kirogate_cache_size Current cache size")
-            lines.append("# TYPE kirogate_cache_size gauge")
-            lines.append(f"kirogate_cache_size {self._cache_size}")
-
-            lines.append("# HELP kirogate_token_valid Token validity status")
-            lines.append("# TYPE kirogate_token_valid gauge")
-            lines.append(f"kirogate_token_valid {1 if self._token_valid else 0}")
+            version = self._version
+            request_total = list(self._request_total.items())
+            error_total = list(self._error_total.items())
+            retry_total = list(self._retry_total.items())
+            input_tokens_total = list(self._input_tokens_total.items())
+            output_tokens_total = list(self._output_tokens_total.items())
+            latency_histogram = [
+                (endpoint, list(counts), self._latency_sum[endpoint], self._latency_count[endpoint])
+                for endpoint, counts in self._latency_histogram.items()
+            ]
+            active_connections = self._active_connections
+            cache_size = self._cache_size
+            token_valid = self._token_valid
 
-            lines.append("# HELP kirogate_uptime_seconds Uptime in seconds")
-            lines.append("# TYPE kirogate_uptime_seconds gauge")
-            lines.append(f"kirogate_uptime_seconds {round(time.time() - self._start_time, 2)}")
+        lines = []
+        append = lines.append
+        extend = lines.extend
+
+        # Info metric with version
+        append("# HELP kirogate_info KiroGate version information")
+        append("# TYPE kirogate_info gauge")
+        append(f'kirogate_info{{version="{APP_VERSION}"}} 1')
+
+        # Total requests
+        append("# HELP kirogate_requests_total Total number of requests")
+        append("# TYPE kirogate_requests_total counter")
+        request_line_prefix = self._request_line_prefix
+        for key, count in request_total:
+            prefix = request_line_prefix.get(key)
+            if prefix is None:
+                endpoint, status, model = key
+                prefix = f'kirogate_requests_total{{endpoint="{endpoint}",status="{status}",model="{model}"}} '
+                request_line_prefix[key] = prefix
+            append(prefix + str(count))
+
+        # Total errors
+        append("# HELP kirogate_errors_total Total number of errors")
+        append("# TYPE kirogate_errors_total counter")
+        extend(f'kirogate_errors_total{{type="{error_type}"}} {count}' for error_type, count in error_total)
+
+        # Total retries
+        append("# HELP kirogate_retries_total Total number of retries")
+        append("# TYPE kirogate_retries_total counter")
+        extend(f'kirogate_retries_total{{endpoint="{endpoint}"}} {count}' for endpoint, count in retry_total)
+
+        # Token usage
+        append("# HELP kirogate_tokens_total Total tokens used")
+        append("# TYPE kirogate_tokens_total counter")
+        extend(f'kirogate_tokens_total{{model="{model}",type="input"}} {tokens}' for model, tokens in input_tokens_total)
+        extend(f'kirogate_tokens_total{{model="{model}",type="output"}} {tokens}' for model, tokens in output_tokens_total)
+
+        # Latency histogram
+        append("# HELP kirogate_request_duration_seconds Request duration histogram")
+        append("# TYPE kirogate_request_duration_seconds histogram")
+        for endpoint, counts, latency_sum, latency_count in latency_histogram:
+            bucket_prefixes, sum_prefix, count_prefix = self._latency_prefixes(endpoint)
+            extend(
+                prefix + str(cumulative)
+                for prefix, cumulative in zip(bucket_prefixes, accumulate(counts))
+            )
+            append(sum_prefix + str(latency_sum))
+            append(count_prefix + str(latency_count))
 
-        return "\n".join(lines) + "\n"
+        # Gauges
+        extend((
+            "# HELP kirogate_active_connections Current active connections",
+            "# TYPE kirogate_active_connections gauge",
+            f"kirogate_active_connections {active_connections}",
+            "# HELP kirogate_cache_size Current cache size",
+            "# TYPE kirogate_cache_size gauge",
+            f"kirogate_cache_size {cache_size}",
+            "# HELP kirogate_token_valid Token validity status",
+            "# TYPE kirogate_token_valid gauge",
+            f"kirogate_token_valid {1 if token_valid else 0}",
+            "# HELP kirogate_uptime_seconds Uptime in seconds",
+            "# TYPE kirogate_uptime_seconds gauge",
+        ))
+
+        # Uptime is appended per call so a cached body never reports a stale value
+        body = "\n".join(lines) + "\n"
+        self._prometheus_cache = (version, time.monotonic(), body)
+        return self._with_uptime(body)
+
+    def _with_uptime(self, body: str) -> str:
+        """Append the current uptime sample to a Prometheus body."""
+        return f"{body}kirogate_uptime_seconds {round(time.time() - self._start_time, 2)}\n"
 
     # ==================== IP Statistics & Admin Methods ====================
 
@@ -709,20 +840,13 @@ class PrometheusMetrics:
         """Record IP request."""
         if not ip:
             return
+        now = int(time.time() * 1000)
         with self._lock:
             self._ip_requests[ip] += 1
-            now = int(time.time() * 1000)
             self._ip_last_seen[ip] = now
-            # Save to DB
-            try:
-                with sqlite3.connect(self._db_path) as conn:
-                    conn.execute(
-                        "INSERT OR REPLACE INTO ip_stats (ip, count, last_seen) VALUES (?, ?, ?)",
-                        (ip, self._ip_requests[ip], now)
-                    )
-                    conn.commit()
-            except Exception as e:
-                logger.debug(f"Failed to save IP stats: {e}")
+            # Persisted by the background writer
+            self._pending_ips[ip] = (self._ip_requests[ip], now)
+            self._write_event.set()
 
     def get_ip_stats(
         self,
@@ -889,8 +1013,8 @@ class PrometheusMetrics:
         with self._lock:
             total_requests = sum(self._request_total.values())
             success_requests = sum(
-                c for k, c in self._request_total.items()
-                if self._is_success_status(k)
+                c for (_endpoint, status, _model), c in self._request_total.items()
+                if self._is_success_status(status)
             )
             return {
                 "totalRequests": total_requests,
@@ -23,8 +23,9 @@ Request tracking middleware.
 Adds unique ID to each request for log correlation and debugging.
 """
 
+import re
+import secrets
 import time
-import uuid
 from datetime import datetime
 from typing import Callable, Optional
 from urllib.parse import urlsplit
@@ -34,6 +35,8 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
 from loguru import logger
 
+from kiro_gateway.metrics import metrics
+
 
 def get_timestamp() -> str:
     """获取格式化的时间戳。"""
@@ -75,6 +78,29 @@ def normalize_endpoint_path(raw_path: str) -> str:
     return raw_path
 
 
+# UUID or purely numeric path segments, collapsed when no route template is available
+_PATH_ID_RE = re.compile(
+    r"/(?:[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|\d+)(?=/|$)"
+)
+
+
+def get_endpoint_label(request: Request) -> str:
+    """
+    Return a bounded-cardinality endpoint label for metrics.
+
+    Prefers the matched route template (e.g. /v1/models/{model_id}) set by the
+    router; otherwise collapses ID-like segments of the normalized path.
+    """
+    route_path = getattr(request.scope.get("route"), "path", None)
+    if route_path:
+        return route_path
+    return _PATH_ID_RE.sub("/{id}", normalize_endpoint_path(request.url.path))
+
+
+# Health checks are polled frequently; tracking and site guard middlewares pass them straight through
+HEALTH_CHECK_PATHS = frozenset({"/health"})
+
+
 class RequestTrackingMiddleware(BaseHTTPMiddleware):
     """
     Request tracking middleware.
@@ -97,54 +123,55 @@ class RequestTrackingMiddleware(BaseHTTPMiddleware):
         Returns:
             HTTP response
         """
+        if request.url.path in HEALTH_CHECK_PATHS:
+            return await call_next(request)
+
         # Get from header or generate new request ID
-        request_id = request.headers.get("X-Request-ID")
-        if not request_id:
-            request_id = str(uuid.uuid4())
+        request_id = request.headers.get("X-Request-ID") or secrets.token_hex(16)
 
         # Record request start time
-        start_time = time.time()
+        start_time = time.monotonic()
 
         # Add request ID to request state
         request.state.request_id = request_id
 
-        # Use loguru context to bind request ID
-        with logger.contextualize(request_id=request_id):
-            client_ip = get_client_ip(request)
-            logger.info(
-                f"[{get_timestamp()}] [IP: {client_ip}] 请求开始: {request.method} {request.url.path}"
-                + (f" 参数: {request.url.query}" if request.url.query else "")
-            )
-
-            try:
-                response = await call_next(request)
-
-                # Calculate processing time
-                process_time = time.time() - start_time
-                user_info = get_user_info(request)
+        # Bound logger carries the request ID without a per-request context push/pop
+        req_logger = logger.bind(request_id=request_id)
+        client_ip = get_client_ip(request)
+        req_logger.info(
+            f"[{get_timestamp()}] [IP: {client_ip}] 请求开始: {request.method} {request.url.path}"
+            + (f" 参数: {request.url.query}" if request.url.query else "")
+        )
 
-                # Add response headers
-                response.headers["X-Request-ID"] = request_id
-                response.headers["X-Process-Time"] = str(round(process_time, 4))
+        try:
+            response = await call_next(request)
 
-                status_text = "成功" if 200 <= response.status_code < 400 else "失败"
-                logger.info(
-                    f"[{get_timestamp()}] [用户: {user_info}] [IP: {client_ip}] "
-                    f"请求{status_text}: {request.method} {request.url.path} "
-                    f"状态码={response.status_code} 耗时={process_time:.4f}秒"
-                )
+            # Calculate processing time
+            process_time = f"{time.monotonic() - start_time:.4f}"
+            user_info = get_user_info(request)
+
+            # Add response headers
+            response.headers["X-Request-ID"] = request_id
+            response.headers["X-Process-Time"] = process_time
+
+            status_text = "成功" if 200 <= response.status_code < 400 else "失败"
+            req_logger.info(
+                f"[{get_timestamp()}] [用户: {user_info}] [IP: {client_ip}] "
+                f"请求{status_text}: {request.method} {request.url.path} "
+                f"状态码={response.status_code} 耗时={process_time}秒"
+            )
 
-                return response
+            return response
 
-            except Exception as e:
-                process_time = time.time() - start_time
-                user_info = get_user_info(request)
-                logger.error(
-                    f"[{get_timestamp()}] [用户: {user_info}] [IP: {client_ip}] "
-                    f"请求异常: {request.method} {request.url.path} "
-                    f"错误={str(e)} 耗时={process_time:.4f}秒"
-                )
-                raise
+        except Exception as e:
+            process_time = time.monotonic() - start_time
+            user_info = get_user_info(request)
+            req_logger.error(
+                f"[{get_timestamp()}] [用户: {user_info}] [IP: {client_ip}] "
+                f"请求异常: {request.method} {request.url.path} "
+                f"错误={str(e)} 耗时={process_time:.4f}秒"
+            )
+            raise
 
 
 class MetricsMiddleware(BaseHTTPMiddleware):
@@ -158,6 +185,9 @@ class MetricsMiddleware(BaseHTTPMiddleware):
     - API Key and Token usage tracking
     """
 
+    # Observability endpoints are not recorded so scrapes don't skew the numbers they read
+    UNTRACKED_PATHS = frozenset({"/health", "/metrics", "/metrics/prometheus", "/api/metrics"})
+
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
         """
         Collect request metrics.
@@ -169,10 +199,10 @@ class MetricsMiddleware(BaseHTTPMiddleware):
         Returns:
             HTTP response
         """
-        from kiro_gateway.metrics import metrics
+        if request.url.path in self.UNTRACKED_PATHS:
+            return await call_next(request)
 
-        start_time = time.time()
-        endpoint = normalize_endpoint_path(request.url.path)
+        start_time = time.monotonic()
         model = "unknown"
 
         # Record client IP
@@ -185,7 +215,8 @@ class MetricsMiddleware(BaseHTTPMiddleware):
             response = await call_next(request)
 
             # Calculate processing time
-            process_time = time.time() - start_time
+            process_time = time.monotonic() - start_time
+            endpoint = get_endpoint_label(request)
 
             # Try to get model name from request state
             if hasattr(request.state, "model"):
@@ -202,7 +233,8 @@ class MetricsMiddleware(BaseHTTPMiddleware):
             return response
 
         except Exception as e:
-            process_time = time.time() - start_time
+            process_time = time.monotonic() - start_time
+            endpoint = get_endpoint_label(request)
             metrics.inc_request(endpoint, 500, model)
             metrics.inc_error(type(e).__name__)
             metrics.observe_latency(endpoint, process_time)
@@ -297,10 +329,11 @@ class SiteGuardMiddleware(BaseHTTPMiddleware):
         Returns:
             HTTP response
         """
-        from kiro_gateway.metrics import metrics
         from starlette.responses import HTMLResponse
 
         path = request.url.path
+        if path in HEALTH_CHECK_PATHS:
+            return await call_next(request)
 
         # Allow admin, auth and static routes
         exempt_prefixes = ("/admin", "/login", "/oauth", "/user", "/static", "/docs", "/openapi.json")
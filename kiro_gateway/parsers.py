@@ -29,8 +29,10 @@ AWS Event Stream 格式解析器。
 
 import json
 import re
-from typing import Any, Dict, List, Optional
+from itertools import chain
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
+import orjson
 from loguru import logger
 
 from kiro_gateway.utils import generate_tool_call_id
@@ -148,27 +150,34 @@ def parse_bracket_tool_calls(response_text: str) -> List[Dict[str, Any]]:
     return tool_calls
 
 
-def deduplicate_tool_calls(tool_calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def deduplicate_tool_calls(*tool_call_lists: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
     Удаляет дубликаты tool calls.
     
+    Принимает несколько источников tool calls и обходит их через
+    itertools.chain, без промежуточного объединённого списка.
+    
     Дедупликация происходит по двум критериям:
     1. По id - если есть несколько tool calls с одинаковым id, оставляем тот у которого
        больше аргументов (не пустой "{}")
     2. По name+arguments - удаляем полные дубликаты
     
     Args:
-        tool_calls: Список tool calls
+        *tool_call_lists: Один или несколько списков tool calls
     
     Returns:
         Список уникальных tool calls
     """
-    # Сначала дедупликация по id - оставляем tool call с непустыми аргументами
+    # Сначала дедупликация по id - оставляем tool call с непустыми аргументами.
+    # Tool calls без id собираем в том же проходе (будут дедуплицированы по name+args)
     by_id: Dict[str, Dict[str, Any]] = {}
-    for tc in tool_calls:
+    without_id: List[Dict[str, Any]] = []
+    total = 0
+    for tc in chain.from_iterable(tool_call_lists):
+        total += 1
         tc_id = tc.get("id", "")
         if not tc_id:
-            # Без id - добавляем как есть (будет дедуплицировано по name+args)
+            without_id.append(tc)
             continue
         
         existing = by_id.get(tc_id)
@@ -184,26 +193,21 @@ def deduplicate_tool_calls(tool_calls: List[Dict[str, Any]]) -> List[Dict[str, A
                 logger.debug(f"Replacing tool call {tc_id} with better arguments: {len(existing_args)} -> {len(current_args)}")
                 by_id[tc_id] = tc
     
-    # Собираем tool calls: сначала те что с id, потом без id
-    result_with_id = list(by_id.values())
-    result_without_id = [tc for tc in tool_calls if not tc.get("id")]
-    
-    # Теперь дедупликация по name+arguments для всех
-    seen = set()
+    # Теперь дедупликация по name+arguments для всех: сначала те что с id, потом без id.
+    # Ключ - кортеж, без форматирования строки и без коллизий через "-" в имени
+    seen: Set[Tuple[str, str]] = set()
     unique = []
     
-    for tc in result_with_id + result_without_id:
+    for tc in chain(by_id.values(), without_id):
         # Защита от None в function
         func = tc.get("function") or {}
-        func_name = func.get("name") or ""
-        func_args = func.get("arguments") or "{}"
-        key = f"{func_name}-{func_args}"
+        key = (func.get("name") or "", func.get("arguments") or "{}")
         if key not in seen:
             seen.add(key)
             unique.append(tc)
     
-    if len(tool_calls) != len(unique):
-        logger.debug(f"Deduplicated tool calls: {len(tool_calls)} -> {len(unique)}")
+    if total != len(unique):
+        logger.debug(f"Deduplicated tool calls: {total} -> {len(unique)}")
     
     return unique
 
@@ -307,7 +311,7 @@ class AwsEventStreamParser:
             self.buffer = self.buffer[json_end + 1:]
             
             try:
-                data = json.loads(json_str)
+                data = orjson.loads(json_str)
                 event = self._process_event(data, earliest_type)
                 if event:
                     events.append(event)
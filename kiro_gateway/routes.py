@@ -65,6 +65,7 @@ from kiro_gateway.models import (
 from kiro_gateway.auth import KiroAuthManager
 from kiro_gateway.auth_cache import auth_cache
 from kiro_gateway.cache import ModelInfoCache
+from kiro_gateway.metrics import metrics
 from kiro_gateway.request_handler import RequestHandler
 from kiro_gateway.utils import get_kiro_headers
 from kiro_gateway.config import settings
@@ -102,11 +103,13 @@ def rate_limit_key_func(request: Request) -> str:
     return get_remote_address(request)
 
 
-# Initialize rate limiter
-limiter = Limiter(key_func=rate_limit_key_func)
+# Initialize rate limiter (not created at all when RATE_LIMIT_PER_MINUTE = 0)
+limiter = Limiter(key_func=rate_limit_key_func) if RATE_LIMIT_PER_MINUTE > 0 else None
 
 # 预创建速率限制装饰器（避免重复创建）
-_rate_limit_decorator_cache = None
+_rate_limit_decorator_cache = (
+    limiter.limit(f"{RATE_LIMIT_PER_MINUTE}/minute") if limiter is not None else (lambda func: func)
+)
 
 
 def rate_limit_decorator():
@@ -114,17 +117,25 @@ def rate_limit_decorator():
     Conditional rate limit decorator (cached).
 
     Applies rate limit when RATE_LIMIT_PER_MINUTE > 0,
-    disabled when RATE_LIMIT_PER_MINUTE = 0.
+    disabled when RATE_LIMIT_PER_MINUTE = 0 (routes are left undecorated).
     """
-    global _rate_limit_decorator_cache
-    if _rate_limit_decorator_cache is None:
-        if RATE_LIMIT_PER_MINUTE > 0:
-            _rate_limit_decorator_cache = limiter.limit(f"{RATE_LIMIT_PER_MINUTE}/minute")
-        else:
-            _rate_limit_decorator_cache = lambda func: func
     return _rate_limit_decorator_cache
 
 
+# /v1/models lists the static AVAILABLE_MODELS, so the body is serialized once;
+# "created" is therefore the process start time rather than the request time
+_MODELS_RESPONSE_BODY = ModelList(
+    data=[
+        OpenAIModel(
+            id=model_id,
+            owned_by="anthropic",
+            description="Claude model via Kiro API"
+        )
+        for model_id in AVAILABLE_MODELS
+    ]
+).model_dump_json().encode("utf-8")
+
+
 try:
     from kiro_gateway.debug_logger import debug_logger
 except ImportError:
@@ -166,7 +177,6 @@ def _get_import_key_from_request(request: Request) -> str | None:
 
 def _get_proxy_api_key(request: Request | None = None) -> str:
     try:
-        from kiro_gateway.metrics import metrics
         proxy_key = metrics.get_proxy_api_key()
         if proxy_key:
             return proxy_key
@@ -557,8 +567,6 @@ async def status_page(request: Request):
     Returns:
         HTML status page
     """
-    from kiro_gateway.metrics import metrics
-
     auth_manager: KiroAuthManager = request.app.state.auth_manager
     model_cache: ModelInfoCache = request.app.state.model_cache
 
@@ -612,8 +620,6 @@ async def health(request: Request):
     Returns:
         Status, timestamp, version and runtime info
     """
-    from kiro_gateway.metrics import metrics
-
     auth_manager: KiroAuthManager = request.app.state.auth_manager
     model_cache: ModelInfoCache = request.app.state.model_cache
 
@@ -642,8 +648,6 @@ async def health(request: Request):
 @router.get("/api/site-mode", include_in_schema=False)
 async def get_site_mode():
     """Get current site mode (normal/self-use/maintenance)."""
-    from kiro_gateway.metrics import metrics
-
     site_enabled = metrics.is_site_enabled()
     self_use_enabled = metrics.is_self_use_enabled()
 
@@ -673,7 +677,6 @@ async def get_metrics():
     Returns:
         Metrics data dictionary
     """
-    from kiro_gateway.metrics import metrics
     return metrics.get_metrics()
 
 
@@ -685,7 +688,6 @@ async def get_api_metrics():
     Returns:
         Deno-compatible metrics data dictionary
     """
-    from kiro_gateway.metrics import metrics
     return metrics.get_deno_compatible_metrics()
 
 
@@ -697,14 +699,13 @@ async def get_prometheus_metrics():
     Returns:
         Prometheus text format metrics
     """
-    from kiro_gateway.metrics import metrics
     return Response(
         content=metrics.export_prometheus(),
         media_type="text/plain; charset=utf-8"
     )
 
 
-@router.get("/v1/models", response_model=ModelList)
+@router.get("/v1/models", responses={200: {"model": ModelList}})
 @rate_limit_decorator()
 async def get_models(
     request: Request,
@@ -731,22 +732,12 @@ async def get_models(
     if model_cache.is_empty() or model_cache.is_stale():
         # Don't block - just trigger refresh in background
         try:
-            import asyncio
-            asyncio.create_task(model_cache.refresh())
+            asyncio.create_task(model_cache.ensure_fresh())
         except Exception as e:
             logger.warning(f"[{get_timestamp()}] 触发模型缓存刷新失败: {e}")
 
     # Return static model list immediately
-    openai_models = [
-        OpenAIModel(
-            id=model_id,
-            owned_by="anthropic",
-            description="Claude model via Kiro API"
-        )
-        for model_id in AVAILABLE_MODELS
-    ]
-
-    return ModelList(data=openai_models)
+    return Response(content=_MODELS_RESPONSE_BODY, media_type="application/json")
 
 
 @router.post("/v1/chat/completions")
@@ -1076,7 +1067,6 @@ async def admin_get_stats(request: Request):
     session = request.cookies.get("admin_session")
     if not verify_admin_session(session):
         return JSONResponse(status_code=401, content={"error": "未授权"})
-    from kiro_gateway.metrics import metrics
 
     stats = metrics.get_admin_stats()
     # Add cached tokens count
@@ -1110,7 +1100,6 @@ async def admin_get_ip_stats(
     session = request.cookies.get("admin_session")
     if not verify_admin_session(session):
         return JSONResponse(status_code=401, content={"error": "未授权"})
-    from kiro_gateway.metrics import metrics
     offset = (page - 1) * page_size
     search = search.strip()
     items, total = metrics.get_ip_stats(
@@ -1147,7 +1136,6 @@ async def admin_get_blacklist(
     session = request.cookies.get("admin_session")
     if not verify_admin_session(session):
         return JSONResponse(status_code=401, content={"error": "未授权"})
-    from kiro_gateway.metrics import metrics
     offset = (page - 1) * page_size
     search = search.strip()
     items, total = metrics.get_blacklist(
@@ -1182,7 +1170,6 @@ async def admin_ban_ip(
     session = request.cookies.get("admin_session")
     if not verify_admin_session(session):
         return JSONResponse(status_code=401, content={"error": "未授权"})
-    from kiro_gateway.metrics import metrics
     success = metrics.ban_ip(ip, reason)
     return {"success": success}
 
@@ -1197,7 +1184,6 @@ async def admin_unban_ip(
     session = request.cookies.get("admin_session")
     if not verify_admin_session(session):
         return JSONResponse(status_code=401, content={"error": "未授权"})
-    from kiro_gateway.metrics import metrics
     success = metrics.unban_ip(ip)
     return {"success": success}
 
@@ -1212,7 +1198,6 @@ async def admin_toggle_site(
     session = request.cookies.get("admin_session")
     if not verify_admin_session(session):
         return JSONResponse(status_code=401, content={"error": "未授权"})
-    from kiro_gateway.metrics import metrics
     success = metrics.set_site_enabled(enabled)
     return {"success": success, "enabled": enabled}
 
@@ -1227,7 +1212,6 @@ async def admin_toggle_self_use(
     session = request.cookies.get("admin_session")
     if not verify_admin_session(session):
         return JSONResponse(status_code=401, content={"error": "未授权"})
-    from kiro_gateway.metrics import metrics
     success = metrics.set_self_use_enabled(enabled)
     return {"success": success, "enabled": enabled}
 
@@ -1237,7 +1221,6 @@ async def admin_get_proxy_key(request: Request):
     session = request.cookies.get("admin_session")
     if not verify_admin_session(session):
         return JSONResponse(status_code=401, content={"error": "未授权"})
-    from kiro_gateway.metrics import metrics
     return {"proxy_api_key": metrics.get_proxy_api_key()}
 
 
@@ -1254,7 +1237,6 @@ async def admin_set_proxy_key(
     proxy_api_key = proxy_api_key.strip()
     if not proxy_api_key:
         return JSONResponse(status_code=400, content={"error": "API Key 不能为空"})
-    from kiro_gateway.metrics import metrics
     success = metrics.set_proxy_api_key(proxy_api_key)
     if not success:
         return JSONResponse(status_code=500, content={"error": "更新失败"})
@@ -1949,7 +1931,6 @@ async def admin_toggle_token_visibility(
     if not verify_admin_session(session):
         return JSONResponse(status_code=401, content={"error": "未授权"})
 
-    from kiro_gateway.metrics import metrics
     if metrics.is_self_use_enabled() and visibility == "public":
         return JSONResponse(status_code=403, content={"error": "自用模式下禁止公开 Token"})
 
@@ -2192,7 +2173,6 @@ async def user_get_profile(request: Request):
     if not user:
         return JSONResponse(status_code=401, content={"error": "未登录"})
     from kiro_gateway.database import user_db
-    from kiro_gateway.metrics import metrics
     token_counts = user_db.get_token_count(user.id)
     api_key_count = user_db.get_api_key_count(user.id)
     public_token_count = 0 if metrics.is_self_use_enabled() else token_counts["public"]
@@ -2359,9 +2339,9 @@ async def user_sync_token_info(
     if not user:
         return JSONResponse(status_code=401, content={"error": "未登录"})
     
-    from kiro_gateway.database import user_db
+    from kiro_gateway.database import TOKEN_INFO_FIELDS, user_db
     from kiro_gateway.auth import KiroAuthManager
-    from kiro_gateway.kiro_api import fetch_token_info
+    from kiro_gateway.kiro_api import detect_idp, fetch_token_info
     from loguru import logger
     
     # Verify user owns this token
@@ -2391,33 +2371,16 @@ async def user_sync_token_info(
             return JSONResponse(status_code=500, content={"error": "获取 access token 失败"})
         
         # 3. Call Kiro API to get account info
-        idp = "BuilderId"
-        if client_id and "github" in client_id.lower():
-            idp = "GitHub"
-        elif client_id and "google" in client_id.lower():
-            idp = "Google"
+        idp = detect_idp(client_id)
         
         info = await fetch_token_info(access_token, idp)
         if not info:
             return JSONResponse(status_code=500, content={"error": "获取账户信息失败"})
         
         # 4. Update database
-        user_db.update_token_info(
-            token_id=token_id,
-            email=info.get("email"),
-            idp=info.get("idp", idp),
-            subscription_type=info.get("subscription_type"),
-            subscription_title=info.get("subscription_title"),
-            usage_current=info.get("usage_current"),
-            usage_limit=info.get("usage_limit"),
-            base_current=info.get("base_current"),
-            base_limit=info.get("base_limit"),
-            trial_current=info.get("trial_current"),
-            trial_limit=info.get("trial_limit"),
-            trial_expiry=info.get("trial_expiry"),
-            next_reset=info.get("next_reset"),
-            days_remaining=info.get("days_remaining")
-        )
+        fields = {field: info.get(field) for field in TOKEN_INFO_FIELDS}
+        fields["idp"] = info.get("idp", idp)
+        user_db.update_token_info(token_id=token_id, **fields)
         
         logger.info(f"[TokenSync] Token {token_id}: Synced successfully - {info.get('email', 'unknown')}")
         
@@ -2457,7 +2420,6 @@ async def user_get_public_tokens(request: Request):
     user = get_current_user(request)
     if not user:
         return JSONResponse(status_code=401, content={"error": "未登录"})
-    from kiro_gateway.metrics import metrics
     if metrics.is_self_use_enabled():
         return JSONResponse(status_code=403, content={"error": "自用模式下不开放公开 Token 池"})
     from kiro_gateway.database import user_db
@@ -2813,7 +2775,6 @@ async def user_donate_token(
     if not user:
         return JSONResponse(status_code=401, content={"error": "未登录"})
 
-    from kiro_gateway.metrics import metrics
     if metrics.is_self_use_enabled() and visibility == "public":
         return JSONResponse(status_code=403, content={"error": "自用模式下禁止公开 Token"})
 
@@ -2868,7 +2829,6 @@ async def user_import_tokens(
         else:
             return JSONResponse(status_code=401, content={"error": "未登录"})
 
-    from kiro_gateway.metrics import metrics
     if metrics.is_self_use_enabled() and visibility == "public":
         return JSONResponse(status_code=403, content={"error": "自用模式下禁止公开 Token"})
 
@@ -2922,7 +2882,6 @@ async def api_import_tokens(
     if user.is_banned:
         return JSONResponse(status_code=403, content={"error": "用户已被封禁"})
 
-    from kiro_gateway.metrics import metrics
     if metrics.is_self_use_enabled() and visibility == "public":
         return JSONResponse(status_code=403, content={"error": "自用模式下禁止公开 Token"})
 
@@ -2963,7 +2922,6 @@ async def user_update_token(
     if not user:
         return JSONResponse(status_code=401, content={"error": "未登录"})
 
-    from kiro_gateway.metrics import metrics
     if metrics.is_self_use_enabled() and visibility == "public":
         return JSONResponse(status_code=403, content={"error": "自用模式下禁止公开 Token"})
 
@@ -3050,7 +3008,6 @@ async def user_create_key(
         return JSONResponse(status_code=401, content={"error": "未登录"})
 
     from kiro_gateway.database import user_db
-    from kiro_gateway.metrics import metrics
 
     # Check if user has any tokens (for info purposes only, not blocking)
     tokens = user_db.get_user_tokens(user.id)
@@ -3119,7 +3076,6 @@ async def public_tokens_page(request: Request):
 @router.get("/api/public-tokens", include_in_schema=False)
 async def get_public_tokens():
     """Get public tokens list (masked)."""
-    from kiro_gateway.metrics import metrics
     if metrics.is_self_use_enabled():
         return JSONResponse(status_code=403, content={"error": "自用模式下不开放公开 Token 池"})
     from kiro_gateway.database import user_db
@@ -33,13 +33,20 @@ import time
 from typing import TYPE_CHECKING, AsyncGenerator, Callable, Awaitable, Optional, Dict, Any, List
 
 import httpx
+import orjson
 from fastapi import HTTPException
 from loguru import logger
 
 from kiro_gateway.parsers import AwsEventStreamParser, parse_bracket_tool_calls, deduplicate_tool_calls
-from kiro_gateway.utils import generate_completion_id
+from kiro_gateway.utils import anext_with_timeout, generate_completion_id, json_dumps
 from kiro_gateway.config import settings, get_adaptive_timeout
-from kiro_gateway.tokenizer import count_tokens, count_message_tokens, count_tools_tokens
+from kiro_gateway.tokenizer import (
+    CLAUDE_CORRECTION_FACTOR,
+    count_tokens,
+    count_message_tokens,
+    count_tools_tokens,
+    get_encoding,
+)
 
 if TYPE_CHECKING:
     from kiro_gateway.auth import KiroAuthManager
@@ -80,10 +87,7 @@ async def _read_chunk_with_timeout(
         StopAsyncIteration: If iterator is exhausted
     """
     try:
-        return await asyncio.wait_for(
-            byte_iterator.__anext__(),
-            timeout=timeout
-        )
+        return await anext_with_timeout(byte_iterator, timeout)
     except asyncio.TimeoutError:
         raise StreamReadTimeoutError(f"流式读取在 {timeout}s 后超时")
 
@@ -94,7 +98,8 @@ def _calculate_usage_tokens(
     model_cache: "ModelInfoCache",
     model: str,
     request_messages: Optional[list],
-    request_tools: Optional[list]
+    request_tools: Optional[list],
+    completion_tokens: Optional[int] = None
 ) -> Dict[str, Any]:
     """
     Calculate token usage from response.
@@ -106,11 +111,14 @@ def _calculate_usage_tokens(
         model: Model name
         request_messages: Request messages for fallback counting
         request_tools: Request tools for fallback counting
+        completion_tokens: Completion tokens already counted while streaming
+            (encodes full_content when None)
 
     Returns:
         Dict with prompt_tokens, completion_tokens, total_tokens and source info
     """
-    completion_tokens = count_tokens(full_content)
+    if completion_tokens is None:
+        completion_tokens = count_tokens(full_content)
 
     total_tokens_from_api = 0
     if context_usage_percentage is not None and context_usage_percentage > 0:
@@ -245,6 +253,9 @@ async def stream_kiro_to_openai_internal(
     metering_data = None
     context_usage_percentage = None
     content_parts: list[str] = []  # 使用 list 替代字符串拼接，提升性能
+    # 逐块累计 completion token（未做 Claude 修正），结束时无需再对全文编码
+    encoder = get_encoding()
+    completion_tokens_running = 0
 
     # 根据模型自适应调整超时时间
     adaptive_first_token_timeout = get_adaptive_timeout(model, first_token_timeout)
@@ -255,10 +266,7 @@ async def stream_kiro_to_openai_internal(
 
         # Wait for first chunk with adaptive timeout
         try:
-            first_byte_chunk = await asyncio.wait_for(
-                byte_iterator.__anext__(),
-                timeout=adaptive_first_token_timeout
-            )
+            first_byte_chunk = await anext_with_timeout(byte_iterator, adaptive_first_token_timeout)
         except asyncio.TimeoutError:
             logger.warning(f"First token timeout after {adaptive_first_token_timeout}s (model: {model})")
             raise FirstTokenTimeoutError(f"在 {adaptive_first_token_timeout}s 内未收到响应")
@@ -276,6 +284,8 @@ async def stream_kiro_to_openai_internal(
             if event["type"] == "content":
                 content = event["data"]
                 content_parts.append(content)
+                if encoder:
+                    completion_tokens_running += len(encoder.encode(content, disallowed_special=()))
 
                 delta = {"content": content}
                 if first_chunk:
@@ -290,7 +300,7 @@ async def stream_kiro_to_openai_internal(
                     "choices": [{"index": 0, "delta": delta, "finish_reason": None}]
                 }
 
-                chunk_text = f"data: {json.dumps(openai_chunk, ensure_ascii=False)}\n\n"
+                chunk_text = f"data: {json_dumps(openai_chunk)}\n\n"
 
                 if debug_logger:
                     debug_logger.log_modified_chunk(chunk_text.encode('utf-8'))
@@ -336,6 +346,8 @@ async def stream_kiro_to_openai_internal(
                 if event["type"] == "content":
                     content = event["data"]
                     content_parts.append(content)
+                    if encoder:
+                        completion_tokens_running += len(encoder.encode(content, disallowed_special=()))
 
                     delta = {"content": content}
                     if first_chunk:
@@ -350,7 +362,7 @@ async def stream_kiro_to_openai_internal(
                         "choices": [{"index": 0, "delta": delta, "finish_reason": None}]
                     }
 
-                    chunk_text = f"data: {json.dumps(openai_chunk, ensure_ascii=False)}\n\n"
+                    chunk_text = f"data: {json_dumps(openai_chunk)}\n\n"
 
                     if debug_logger:
                         debug_logger.log_modified_chunk(chunk_text.encode('utf-8'))
@@ -368,15 +380,15 @@ async def stream_kiro_to_openai_internal(
 
         # Check bracket-style tool calls in full content
         bracket_tool_calls = parse_bracket_tool_calls(full_content)
-        all_tool_calls = parser.get_tool_calls() + bracket_tool_calls
-        all_tool_calls = deduplicate_tool_calls(all_tool_calls)
+        all_tool_calls = deduplicate_tool_calls(parser.get_tool_calls(), bracket_tool_calls)
 
         finish_reason = "tool_calls" if all_tool_calls else "stop"
 
         # Calculate usage tokens using helper function
         usage_info = _calculate_usage_tokens(
             full_content, context_usage_percentage, model_cache, model,
-            request_messages, request_tools
+            request_messages, request_tools,
+            completion_tokens=int(completion_tokens_running * CLAUDE_CORRECTION_FACTOR) if encoder else None
         )
 
         # Send tool calls if any
@@ -395,7 +407,7 @@ async def stream_kiro_to_openai_internal(
                     "finish_reason": None
                 }]
             }
-            yield f"data: {json.dumps(tool_calls_chunk, ensure_ascii=False)}\n\n"
+            yield f"data: {json_dumps(tool_calls_chunk)}\n\n"
 
         # Final chunk with usage
         final_chunk = {
@@ -421,7 +433,7 @@ async def stream_kiro_to_openai_internal(
             f"total_tokens={usage_info['total_tokens']} ({usage_info['total_source']})"
         )
 
-        yield f"data: {json.dumps(final_chunk, ensure_ascii=False)}\n\n"
+        yield f"data: {json_dumps(final_chunk)}\n\n"
         yield "data: [DONE]\n\n"
 
     except FirstTokenTimeoutError:
@@ -640,7 +652,7 @@ async def collect_stream_response(
             continue
         
         try:
-            chunk_data = json.loads(data_str)
+            chunk_data = orjson.loads(data_str)
             
             # Извлекаем данные из chunk
             delta = chunk_data.get("choices", [{}])[0].get("delta", {})
@@ -751,6 +763,9 @@ async def stream_kiro_to_anthropic(
     metering_data = None
     context_usage_percentage = None
     content_parts: list[str] = []  # 使用 list 替代字符串拼接，提升性能
+    # 逐块累计 completion token（未做 Claude 修正），结束时无需再对全文编码
+    encoder = get_encoding()
+    completion_tokens_running = 0
     content_block_index = 0
     text_block_started = False
     tool_blocks_started = {}  # tool_id -> index
@@ -788,7 +803,7 @@ async def stream_kiro_to_anthropic(
         }
 
         
-        yield f"event: message_start\ndata: {json.dumps(message_start, ensure_ascii=False)}\n\n"
+        yield f"event: message_start\ndata: {json_dumps(message_start)}\n\n"
 
         # Read chunks with adaptive timeout
         # 对于慢模型和大文档，可能需要更长时间等待每个 chunk
@@ -823,6 +838,8 @@ async def stream_kiro_to_anthropic(
                 if event["type"] == "content":
                     content = event["data"]
                     content_parts.append(content)
+                    if encoder:
+                        completion_tokens_running += len(encoder.encode(content, disallowed_special=()))
 
                     # Если text block ещё не начат, начинаем его
                     if not text_block_started:
@@ -831,7 +848,7 @@ async def stream_kiro_to_anthropic(
                             "index": content_block_index,
                             "content_block": {"type": "text", "text": ""}
                         }
-                        yield f"event: content_block_start\ndata: {json.dumps(block_start, ensure_ascii=False)}\n\n"
+                        yield f"event: content_block_start\ndata: {json_dumps(block_start)}\n\n"
                         text_block_started = True
 
                     # Отправляем text_delta
@@ -840,10 +857,10 @@ async def stream_kiro_to_anthropic(
                         "index": content_block_index,
                         "delta": {"type": "text_delta", "text": content}
                     }
-                    yield f"event: content_block_delta\ndata: {json.dumps(delta, ensure_ascii=False)}\n\n"
+                    yield f"event: content_block_delta\ndata: {json_dumps(delta)}\n\n"
 
                     if debug_logger:
-                        debug_logger.log_modified_chunk(f"event: content_block_delta\ndata: {json.dumps(delta)}\n\n".encode('utf-8'))
+                        debug_logger.log_modified_chunk(f"event: content_block_delta\ndata: {json_dumps(delta)}\n\n".encode('utf-8'))
 
                 elif event["type"] == "usage":
                     metering_data = event["data"]
@@ -857,7 +874,7 @@ async def stream_kiro_to_anthropic(
                 "type": "content_block_stop",
                 "index": content_block_index
             }
-            yield f"event: content_block_stop\ndata: {json.dumps(block_stop, ensure_ascii=False)}\n\n"
+            yield f"event: content_block_stop\ndata: {json_dumps(block_stop)}\n\n"
             content_block_index += 1
 
         # 合并 content 部分（比字符串拼接更高效）
@@ -865,8 +882,7 @@ async def stream_kiro_to_anthropic(
 
         # Обрабатываем tool calls
         bracket_tool_calls = parse_bracket_tool_calls(full_content)
-        all_tool_calls = parser.get_tool_calls() + bracket_tool_calls
-        all_tool_calls = deduplicate_tool_calls(all_tool_calls)
+        all_tool_calls = deduplicate_tool_calls(parser.get_tool_calls(), bracket_tool_calls)
 
         # Отправляем tool_use blocks
         for tc in all_tool_calls:
@@ -891,7 +907,7 @@ async def stream_kiro_to_anthropic(
                     "input": {}
                 }
             }
-            yield f"event: content_block_start\ndata: {json.dumps(tool_block_start, ensure_ascii=False)}\n\n"
+            yield f"event: content_block_start\ndata: {json_dumps(tool_block_start)}\n\n"
 
             # input_json_delta
             if tool_input:
@@ -900,17 +916,17 @@ async def stream_kiro_to_anthropic(
                     "index": content_block_index,
                     "delta": {
                         "type": "input_json_delta",
-                        "partial_json": json.dumps(tool_input, ensure_ascii=False)
+                        "partial_json": json_dumps(tool_input)
                     }
                 }
-                yield f"event: content_block_delta\ndata: {json.dumps(input_delta, ensure_ascii=False)}\n\n"
+                yield f"event: content_block_delta\ndata: {json_dumps(input_delta)}\n\n"
 
             # content_block_stop
             tool_block_stop = {
                 "type": "content_block_stop",
                 "index": content_block_index
             }
-            yield f"event: content_block_stop\ndata: {json.dumps(tool_block_stop, ensure_ascii=False)}\n\n"
+            yield f"event: content_block_stop\ndata: {json_dumps(tool_block_stop)}\n\n"
 
             content_block_index += 1
 
@@ -920,7 +936,8 @@ async def stream_kiro_to_anthropic(
         # 使用统一的 token 计算函数（消除重复代码）
         usage_info = _calculate_usage_tokens(
             full_content, context_usage_percentage, model_cache, model,
-            request_messages, request_tools
+            request_messages, request_tools,
+            completion_tokens=int(completion_tokens_running * CLAUDE_CORRECTION_FACTOR) if encoder else None
         )
         input_tokens = usage_info["prompt_tokens"]
         completion_tokens = usage_info["completion_tokens"]
@@ -936,7 +953,7 @@ async def stream_kiro_to_anthropic(
                 "output_tokens": completion_tokens
             }
         }
-        yield f"event: message_delta\ndata: {json.dumps(message_delta, ensure_ascii=False)}\n\n"
+        yield f"event: message_delta\ndata: {json_dumps(message_delta)}\n\n"
 
         # Отправляем message_stop
         yield f"event: message_stop\ndata: {{\"type\": \"message_stop\"}}\n\n"
@@ -957,7 +974,7 @@ async def stream_kiro_to_anthropic(
                 "message": error_msg
             }
         }
-        yield f"event: error\ndata: {json.dumps(error_event, ensure_ascii=False)}\n\n"
+        yield f"event: error\ndata: {json_dumps(error_event)}\n\n"
     finally:
         await response.aclose()
         logger.debug("Anthropic streaming completed")
@@ -1044,8 +1061,7 @@ async def collect_anthropic_response(
 
     # Обрабатываем tool calls
     bracket_tool_calls = parse_bracket_tool_calls(full_content)
-    all_tool_calls = parser.get_tool_calls() + bracket_tool_calls
-    all_tool_calls = deduplicate_tool_calls(all_tool_calls)
+    all_tool_calls = deduplicate_tool_calls(parser.get_tool_calls(), bracket_tool_calls)
 
     # Формируем content blocks
     content_blocks = []
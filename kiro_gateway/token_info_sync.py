@@ -8,12 +8,14 @@ Token 信息同步服务。
 
 import asyncio
 import time
-from typing import Optional
+from typing import Dict, Optional, Tuple
 from loguru import logger
 
-from kiro_gateway.database import UserDatabase
+from kiro_gateway.database import TOKEN_INFO_FIELDS, UserDatabase
 from kiro_gateway.auth import KiroAuthManager
-from kiro_gateway.kiro_api import fetch_token_info
+from kiro_gateway.config import settings
+from kiro_gateway.http_client import retry_delay
+from kiro_gateway.kiro_api import TokenInfoError, detect_idp, fetch_token_info
 
 
 # 全局数据库实例
@@ -27,14 +29,26 @@ class TokenInfoSyncService:
     定期从 Kiro API 获取账户信息并更新到数据库。
     """
     
-    def __init__(self, sync_interval: int = 1800):
+    def __init__(self, sync_interval: int = 1800, concurrency: int = 10, per_token_cost: float = 0.3):
         """
         初始化同步服务。
         
         Args:
             sync_interval: 同步间隔（秒），默认 30 分钟
+            concurrency: 同时同步的 Token 数量上限，默认 10
+            per_token_cost: 每个 Token 分摊的最小间隔（秒），Token 很多时自动拉长同步间隔
         """
         self.sync_interval = sync_interval
+        self.concurrency = concurrency
+        self.per_token_cost = per_token_cost
+        self._sem = asyncio.Semaphore(concurrency)
+        # token_id -> (AuthManager, idp)；复用 AuthManager 内部缓存的 access_token，
+        # 避免每轮同步都读库并走一次 refresh-token 请求
+        self._auth_managers: Dict[int, Tuple[KiroAuthManager, str]] = {}
+        # token_id -> 创建 AuthManager 时数据库中的 refresh_token，库中凭证轮换后据此重建
+        self._auth_sources: Dict[int, str] = {}
+        # token_id -> Lock，同一 Token 的并发同步只创建一个 AuthManager
+        self._auth_locks: Dict[int, asyncio.Lock] = {}
         self._running = False
         self._task: Optional[asyncio.Task] = None
     
@@ -48,66 +62,143 @@ class TokenInfoSyncService:
         Returns:
             True if sync successful
         """
+        row = await self._fetch_token_row(token_id)
+        if row is None:
+            return False
+        
         try:
-            # 1. 获取 token 凭证
-            credentials = user_db.get_token_credentials(token_id)
-            if not credentials or not credentials.get('refresh_token'):
-                logger.warning(f"[TokenSync] Token {token_id}: No credentials found")
-                return False
-            
-            refresh_token = credentials['refresh_token']
-            client_id = credentials.get('client_id')
-            client_secret = credentials.get('client_secret')
+            await asyncio.to_thread(lambda: user_db.update_token_info(**row))
+        except Exception as e:
+            logger.error(f"[TokenSync] Token {token_id}: Sync failed - {e}")
+            return False
+        
+        logger.info(f"[TokenSync] Token {token_id}: Synced successfully - {row.get('email') or 'unknown'}")
+        return True
+    
+    async def _fetch_token_row(self, token_id: int) -> Optional[Dict]:
+        """
+        获取单个 Token 的账户信息（不写数据库）。
+        
+        Args:
+            token_id: Token ID
             
-            # 2. 创建 AuthManager 并获取 access_token
-            auth_manager = KiroAuthManager(
-                refresh_token=refresh_token,
-                client_id=client_id,
-                client_secret=client_secret
-            )
+        Returns:
+            update_token_info 的参数字典，失败时返回 None
+        """
+        try:
+            # 1. 获取（或复用）AuthManager
+            auth = await self._get_auth_manager(token_id)
+            if auth is None:
+                logger.warning(f"[TokenSync] Token {token_id}: No credentials found")
+                return None
+            auth_manager, idp = auth
             
-            access_token = await auth_manager.get_access_token()
+            # 2. 获取 access_token（未临近过期时直接使用缓存）
+            try:
+                access_token = await auth_manager.get_access_token()
+            except Exception:
+                # 凭证可能已变更或失效，下次重新从数据库加载
+                self._drop_auth_manager(token_id)
+                raise
             if not access_token:
                 logger.warning(f"[TokenSync] Token {token_id}: Failed to get access token")
-                return False
+                return None
             
             # 3. 调用 Kiro API 获取账户信息
-            # 检测 idp 类型
-            idp = "BuilderId"
-            if client_id and "github" in client_id.lower():
-                idp = "GitHub"
-            elif client_id and "google" in client_id.lower():
-                idp = "Google"
-            
-            info = await fetch_token_info(access_token, idp)
+            # 临时性失败（限流、5xx、网络错误）在本轮内退避重试，而不是等到下一轮；
+            # 401/403 等凭证错误重试也不会成功，直接放弃
+            info = None
+            for attempt in range(settings.max_retries):
+                try:
+                    info = await fetch_token_info(access_token, idp, raise_on_error=True)
+                    break
+                except TokenInfoError as e:
+                    if not e.transient or attempt + 1 == settings.max_retries:
+                        logger.warning(f"[TokenSync] Token {token_id}: Failed to fetch token info - {e}")
+                        return None
+                    delay = retry_delay(attempt)
+                    logger.debug(f"[TokenSync] Token {token_id}: Fetch failed, retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
             if not info:
                 logger.warning(f"[TokenSync] Token {token_id}: Failed to fetch token info")
-                return False
-            
-            # 4. 更新数据库
-            user_db.update_token_info(
-                token_id=token_id,
-                email=info.get("email"),
-                idp=info.get("idp", idp),
-                subscription_type=info.get("subscription_type"),
-                subscription_title=info.get("subscription_title"),
-                usage_current=info.get("usage_current"),
-                usage_limit=info.get("usage_limit"),
-                base_current=info.get("base_current"),
-                base_limit=info.get("base_limit"),
-                trial_current=info.get("trial_current"),
-                trial_limit=info.get("trial_limit"),
-                trial_expiry=info.get("trial_expiry"),
-                next_reset=info.get("next_reset"),
-                days_remaining=info.get("days_remaining")
-            )
+                return None
             
-            logger.info(f"[TokenSync] Token {token_id}: Synced successfully - {info.get('email', 'unknown')}")
-            return True
+            # 4. 组装待写入的数据库字段
+            row = {field: info.get(field) for field in TOKEN_INFO_FIELDS}
+            row["idp"] = info.get("idp", idp)
+            row["token_id"] = token_id
+            return row
             
         except Exception as e:
             logger.error(f"[TokenSync] Token {token_id}: Sync failed - {e}")
-            return False
+            return None
+    
+    async def _get_auth_manager(self, token_id: int) -> Optional[Tuple[KiroAuthManager, str]]:
+        """
+        获取 Token 对应的 AuthManager 及 idp 类型，首次使用时从数据库加载凭证。
+        
+        Args:
+            token_id: Token ID
+            
+        Returns:
+            (AuthManager, idp)，无凭证时返回 None
+        """
+        cached = self._auth_managers.get(token_id)
+        if cached is not None:
+            return cached
+        
+        async with self._auth_locks.setdefault(token_id, asyncio.Lock()):
+            # 等锁期间可能已由其他协程创建
+            cached = self._auth_managers.get(token_id)
+            if cached is not None:
+                return cached
+            
+            # SQLite 调用放到线程池，避免并发同步时阻塞事件循环
+            credentials = await asyncio.to_thread(user_db.get_token_credentials, token_id)
+            return self._create_auth_manager(token_id, credentials)
+    
+    def _create_auth_manager(
+        self,
+        token_id: int,
+        credentials: Optional[Dict[str, Optional[str]]]
+    ) -> Optional[Tuple[KiroAuthManager, str]]:
+        """
+        根据凭证创建并缓存 AuthManager。
+        
+        Args:
+            token_id: Token ID
+            credentials: get_token_credentials 返回的凭证字典
+            
+        Returns:
+            (AuthManager, idp)，无 refresh_token 时返回 None
+        """
+        if not credentials or not credentials.get('refresh_token'):
+            self._drop_auth_manager(token_id)
+            return None
+        
+        client_id = credentials.get('client_id')
+        
+        # idp 随 AuthManager 一起缓存，每个 Token 只判断一次
+        idp = detect_idp(client_id)
+        
+        auth_manager = KiroAuthManager(
+            refresh_token=credentials['refresh_token'],
+            client_id=client_id,
+            client_secret=credentials.get('client_secret')
+        )
+        self._auth_managers[token_id] = (auth_manager, idp)
+        self._auth_sources[token_id] = credentials['refresh_token']
+        return auth_manager, idp
+    
+    def _drop_auth_manager(self, token_id: int) -> None:
+        """
+        丢弃 Token 缓存的 AuthManager，下次使用时重新从数据库加载凭证。
+        
+        Args:
+            token_id: Token ID
+        """
+        self._auth_managers.pop(token_id, None)
+        self._auth_sources.pop(token_id, None)
     
     async def sync_all_tokens(self) -> dict:
         """
@@ -116,24 +207,53 @@ class TokenInfoSyncService:
         Returns:
             {"success": N, "failed": M, "total": N+M}
         """
-        tokens = user_db.get_all_active_tokens()
-        success = 0
-        failed = 0
+        # 一次查询取出所有活跃 Token 的凭证，避免逐个 Token 查库（N+1）
+        credentials_by_id = await asyncio.to_thread(user_db.get_active_token_credentials)
+        token_ids = list(credentials_by_id)
         
-        logger.info(f"[TokenSync] Starting sync for {len(tokens)} active tokens...")
+        # 丢弃已不再活跃的 Token 的 AuthManager；新 Token 或库中 refresh_token
+        # 已轮换的 Token 直接用已取出的凭证（重新）创建
+        for token_id in self._auth_managers.keys() - credentials_by_id.keys():
+            self._drop_auth_manager(token_id)
+        for token_id in self._auth_locks.keys() - credentials_by_id.keys():
+            del self._auth_locks[token_id]
+        for token_id, credentials in credentials_by_id.items():
+            if self._auth_sources.get(token_id) != credentials.get('refresh_token'):
+                self._create_auth_manager(token_id, credentials)
         
-        for token in tokens:
-            try:
-                if await self.sync_token_info(token.id):
-                    success += 1
-                else:
-                    failed += 1
-            except Exception as e:
-                logger.error(f"[TokenSync] Token {token.id}: {e}")
-                failed += 1
-            
-            # 避免请求过快
-            await asyncio.sleep(0.5)
+        logger.info(f"[TokenSync] Starting sync for {len(token_ids)} active tokens (concurrency: {self.concurrency})...")
+        
+        # 先获取信号量再创建任务：任务按空闲槽位逐个创建，而不是一次性为所有 Token 创建
+        tasks = []
+        try:
+            for token_id in token_ids:
+                await self._sem.acquire()
+                task = asyncio.create_task(self._fetch_token_row(token_id))
+                task.add_done_callback(lambda _: self._sem.release())
+                tasks.append(task)
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+        except asyncio.CancelledError:
+            # 被取消时连同已创建的任务一起取消，不留下孤儿任务
+            for task in tasks:
+                task.cancel()
+            raise
+        
+        rows = []
+        for token_id, result in zip(token_ids, results):
+            if isinstance(result, BaseException):
+                logger.error(f"[TokenSync] Token {token_id}: {result}")
+            elif result is not None:
+                rows.append(result)
+        
+        # 所有结果在一个事务中批量写入
+        try:
+            await asyncio.to_thread(user_db.update_token_info_bulk, rows)
+        except Exception as e:
+            logger.error(f"[TokenSync] Bulk update failed - {e}")
+            rows = []
+        
+        success = len(rows)
+        failed = len(token_ids) - success
         
         logger.info(f"[TokenSync] Sync completed: {success} success, {failed} failed")
         return {"success": success, "failed": failed, "total": success + failed}
@@ -142,13 +262,20 @@ class TokenInfoSyncService:
         """后台同步循环。"""
         logger.info(f"[TokenSync] Background sync started (interval: {self.sync_interval}s)")
         
+        last_total = 0
+        last_duration = 0.0
         while self._running:
             try:
-                # 等待指定间隔
-                await asyncio.sleep(self.sync_interval)
+                # 间隔随 Token 数量增长；上一轮耗时计入间隔，超时则立即开始下一轮
+                interval = max(self.sync_interval, last_total * self.per_token_cost)
+                if interval > last_duration:
+                    await asyncio.sleep(interval - last_duration)
                 
                 if self._running:
-                    await self.sync_all_tokens()
+                    started = time.monotonic()
+                    result = await self.sync_all_tokens()
+                    last_total = result["total"]
+                    last_duration = time.monotonic() - started
                     
             except asyncio.CancelledError:
                 logger.info("[TokenSync] Background sync cancelled")
@@ -165,12 +292,25 @@ class TokenInfoSyncService:
         self._task = asyncio.create_task(self._background_sync_loop())
         logger.info("[TokenSync] Token info sync service started")
     
-    def stop(self):
-        """停止后台同步服务。"""
+    async def stop(self, timeout: float = 5.0):
+        """
+        停止后台同步服务，并等待后台任务退出。
+        
+        Args:
+            timeout: 等待后台任务结束的最长时间（秒）
+        """
         self._running = False
         if self._task:
             self._task.cancel()
+            try:
+                await asyncio.wait_for(self._task, timeout=timeout)
+            except (asyncio.CancelledError, asyncio.TimeoutError):
+                pass
             self._task = None
+        # AuthManager 共用全局 HTTP 连接池，无需逐个关闭，释放引用即可
+        self._auth_managers.clear()
+        self._auth_sources.clear()
+        self._auth_locks.clear()
         logger.info("[TokenSync] Token info sync service stopped")
 
 
@@ -32,54 +32,56 @@ Claude не является публичным. Anthropic не публикуе
 больше чем GPT-4 (cl100k_base). Это связано с различиями в BPE словарях.
 """
 
+import json
+from functools import lru_cache
 from typing import List, Dict, Any, Optional
 from loguru import logger
 
-# Ленивая загрузка tiktoken для ускорения импорта
-_encoding = None
-
 # Коэффициент коррекции для Claude моделей
 # Claude токенизирует текст примерно на 15% больше чем GPT-4 (cl100k_base)
 # Это эмпирическое значение, основанное на сравнении с context_usage от API
 CLAUDE_CORRECTION_FACTOR = 1.15
 
 
-def _get_encoding():
+@lru_cache(maxsize=1)
+def get_encoding():
     """
     Ленивая инициализация токенизатора.
     
     Использует cl100k_base - кодировку для GPT-4/ChatGPT,
     которая достаточно близка к токенизации Claude.
     
+    Результат кэшируется: tiktoken загружается один раз на процесс,
+    вызывающий код может сохранить экземпляр и передавать его через
+    параметр encoding в count_* функции.
+    
     Returns:
         tiktoken.Encoding или None если tiktoken недоступен
     """
-    global _encoding
-    if _encoding is None:
-        try:
-            import tiktoken
-            _encoding = tiktoken.get_encoding("cl100k_base")
-            logger.debug("[Tokenizer] Initialized tiktoken with cl100k_base encoding")
-        except ImportError:
-            logger.warning(
-                "[Tokenizer] tiktoken not installed. "
-                "Token counting will use fallback estimation. "
-                "Install with: pip install tiktoken"
-            )
-            _encoding = False  # Маркер что импорт не удался
-        except Exception as e:
-            logger.error(f"[Tokenizer] Failed to initialize tiktoken: {e}")
-            _encoding = False
-    return _encoding if _encoding else None
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("cl100k_base")
+        logger.debug("[Tokenizer] Initialized tiktoken with cl100k_base encoding")
+        return encoding
+    except ImportError:
+        logger.warning(
+            "[Tokenizer] tiktoken not installed. "
+            "Token counting will use fallback estimation. "
+            "Install with: pip install tiktoken"
+        )
+    except Exception as e:
+        logger.error(f"[Tokenizer] Failed to initialize tiktoken: {e}")
+    return None
 
 
-def count_tokens(text: str, apply_claude_correction: bool = True) -> int:
+def count_tokens(text: str, apply_claude_correction: bool = True, encoding=None) -> int:
     """
     Подсчитывает количество токенов в тексте.
     
     Args:
         text: Текст для подсчёта токенов
         apply_claude_correction: Применять коэффициент коррекции для Claude (по умолчанию True)
+        encoding: Заранее полученный tiktoken.Encoding (по умолчанию get_encoding())
     
     Returns:
         Количество токенов (приблизительное, с коррекцией для Claude)
@@ -87,7 +89,8 @@ def count_tokens(text: str, apply_claude_correction: bool = True) -> int:
     if not text:
         return 0
     
-    encoding = _get_encoding()
+    if encoding is None:
+        encoding = get_encoding()
     if encoding:
         try:
             base_tokens = len(encoding.encode(text))
@@ -106,7 +109,11 @@ def count_tokens(text: str, apply_claude_correction: bool = True) -> int:
     return base_estimate
 
 
-def count_message_tokens(messages: List[Dict[str, Any]], apply_claude_correction: bool = True) -> int:
+def count_message_tokens(
+    messages: List[Dict[str, Any]],
+    apply_claude_correction: bool = True,
+    encoding=None
+) -> int:
     """
     Подсчитывает токены в списке сообщений чата.
     
@@ -118,6 +125,7 @@ def count_message_tokens(messages: List[Dict[str, Any]], apply_claude_correction
     Args:
         messages: Список сообщений в формате OpenAI
         apply_claude_correction: Применять коэффициент коррекции для Claude
+        encoding: Заранее полученный tiktoken.Encoding (по умолчанию get_encoding())
     
     Returns:
         Приблизительное количество токенов (с коррекцией для Claude)
@@ -125,6 +133,8 @@ def count_message_tokens(messages: List[Dict[str, Any]], apply_claude_correction
     if not messages:
         return 0
     
+    if encoding is None:
+        encoding = get_encoding()
     total_tokens = 0
     
     for message in messages:
@@ -133,19 +143,19 @@ def count_message_tokens(messages: List[Dict[str, Any]], apply_claude_correction
         
         # Токены роли (без коррекции, это короткие строки)
         role = message.get("role", "")
-        total_tokens += count_tokens(role, apply_claude_correction=False)
+        total_tokens += count_tokens(role, apply_claude_correction=False, encoding=encoding)
         
         # Токены контента
         content = message.get("content")
         if content:
             if isinstance(content, str):
-                total_tokens += count_tokens(content, apply_claude_correction=False)
+                total_tokens += count_tokens(content, apply_claude_correction=False, encoding=encoding)
             elif isinstance(content, list):
                 # Мультимодальный контент (текст + изображения)
                 for item in content:
                     if isinstance(item, dict):
                         if item.get("type") == "text":
-                            total_tokens += count_tokens(item.get("text", ""), apply_claude_correction=False)
+                            total_tokens += count_tokens(item.get("text", ""), apply_claude_correction=False, encoding=encoding)
                         elif item.get("type") == "image_url":
                             # Изображения занимают ~85-170 токенов в зависимости от размера
                             total_tokens += 100  # Средняя оценка
@@ -156,12 +166,12 @@ def count_message_tokens(messages: List[Dict[str, Any]], apply_claude_correction
             for tc in tool_calls:
                 total_tokens += 4  # Служебные токены
                 func = tc.get("function", {})
-                total_tokens += count_tokens(func.get("name", ""), apply_claude_correction=False)
-                total_tokens += count_tokens(func.get("arguments", ""), apply_claude_correction=False)
+                total_tokens += count_tokens(func.get("name", ""), apply_claude_correction=False, encoding=encoding)
+                total_tokens += count_tokens(func.get("arguments", ""), apply_claude_correction=False, encoding=encoding)
         
         # Токены tool_call_id (для ответов от инструментов)
         if message.get("tool_call_id"):
-            total_tokens += count_tokens(message["tool_call_id"], apply_claude_correction=False)
+            total_tokens += count_tokens(message["tool_call_id"], apply_claude_correction=False, encoding=encoding)
     
     # Финальные служебные токены
     total_tokens += 3
@@ -172,13 +182,18 @@ def count_message_tokens(messages: List[Dict[str, Any]], apply_claude_correction
     return total_tokens
 
 
-def count_tools_tokens(tools: Optional[List[Dict[str, Any]]], apply_claude_correction: bool = True) -> int:
+def count_tools_tokens(
+    tools: Optional[List[Dict[str, Any]]],
+    apply_claude_correction: bool = True,
+    encoding=None
+) -> int:
     """
     Подсчитывает токены в определениях инструментов.
     
     Args:
         tools: Список инструментов в формате OpenAI
         apply_claude_correction: Применять коэффициент коррекции для Claude
+        encoding: Заранее полученный tiktoken.Encoding (по умолчанию get_encoding())
     
     Returns:
         Приблизительное количество токенов (с коррекцией для Claude)
@@ -186,6 +201,8 @@ def count_tools_tokens(tools: Optional[List[Dict[str, Any]]], apply_claude_corre
     if not tools:
         return 0
     
+    if encoding is None:
+        encoding = get_encoding()
     total_tokens = 0
     
     for tool in tools:
@@ -195,17 +212,16 @@ def count_tools_tokens(tools: Optional[List[Dict[str, Any]]], apply_claude_corre
             func = tool.get("function", {})
             
             # Имя функции
-            total_tokens += count_tokens(func.get("name", ""), apply_claude_correction=False)
+            total_tokens += count_tokens(func.get("name", ""), apply_claude_correction=False, encoding=encoding)
             
             # Описание функции
-            total_tokens += count_tokens(func.get("description", ""), apply_claude_correction=False)
+            total_tokens += count_tokens(func.get("description", ""), apply_claude_correction=False, encoding=encoding)
             
             # Параметры (JSON schema)
             params = func.get("parameters")
             if params:
-                import json
                 params_str = json.dumps(params, ensure_ascii=False)
-                total_tokens += count_tokens(params_str, apply_claude_correction=False)
+                total_tokens += count_tokens(params_str, apply_claude_correction=False, encoding=encoding)
     
     # Применяем коррекцию к общему количеству
     if apply_claude_correction:
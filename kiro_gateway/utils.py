@@ -24,15 +24,23 @@ KiroBridge 辅助工具函数。
 и другие общие утилиты.
 """
 
+import asyncio
 import hashlib
+import json
 import uuid
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any, AsyncIterator, TypeVar
 
+import orjson
 from loguru import logger
 
 if TYPE_CHECKING:
     from kiro_gateway.auth import KiroAuthManager
 
+T = TypeVar("T")
+
+# asyncio.timeout() доступен начиная с Python 3.11
+_HAS_ASYNCIO_TIMEOUT = hasattr(asyncio, "timeout")
+
 
 def get_machine_fingerprint() -> str:
     """
@@ -88,6 +96,53 @@ def get_kiro_headers(auth_manager: "KiroAuthManager", token: str) -> dict:
     }
 
 
+def json_dumps(obj: Any) -> str:
+    """
+    Быстрая сериализация объекта в JSON-строку через orjson.
+    
+    Эквивалент json.dumps(obj, ensure_ascii=False), но без Python-уровня
+    построения строки. Используется в горячих путях стриминга.
+    
+    orjson не принимает целые больше 64 бит и не-строковые ключи словарей;
+    такие значения (например, в tool input от модели) сериализуются через
+    json.dumps, чтобы не обрывать стрим посреди ответа.
+    
+    Args:
+        obj: Сериализуемый объект
+    
+    Returns:
+        JSON-строка (UTF-8, без экранирования не-ASCII символов)
+    """
+    try:
+        return orjson.dumps(obj).decode("utf-8")
+    except TypeError:
+        return json.dumps(obj, ensure_ascii=False)
+
+
+async def anext_with_timeout(iterator: AsyncIterator[T], timeout: float) -> T:
+    """
+    Читает следующий элемент асинхронного итератора с таймаутом.
+    
+    На Python 3.11+ использует asyncio.timeout(), который не оборачивает
+    корутину в отдельную Task; на более старых версиях — asyncio.wait_for().
+    
+    Args:
+        iterator: Асинхронный итератор
+        timeout: Таймаут в секундах
+    
+    Returns:
+        Следующий элемент итератора
+    
+    Raises:
+        asyncio.TimeoutError: Если таймаут истёк
+        StopAsyncIteration: Если итератор исчерпан
+    """
+    if _HAS_ASYNCIO_TIMEOUT:
+        async with asyncio.timeout(timeout):
+            return await iterator.__anext__()
+    return await asyncio.wait_for(iterator.__anext__(), timeout=timeout)
+
+
 def generate_completion_id() -> str:
     """
     Генерирует уникальный ID для chat completion.
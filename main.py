@@ -28,6 +28,7 @@ KiroGate - OpenAI & Anthropic 兼容的 Kiro API 网关。
     python main.py
 """
 
+import inspect
 import logging
 import sys
 import asyncio
@@ -37,7 +38,6 @@ from pathlib import Path
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
 from loguru import logger
-from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 
 from kiro_gateway.config import (
@@ -51,7 +51,7 @@ from kiro_gateway.cache import ModelInfoCache
 from kiro_gateway.routes import router, limiter, rate_limit_handler
 from kiro_gateway.exceptions import validation_exception_handler
 from kiro_gateway.middleware import RequestTrackingMiddleware, MetricsMiddleware, SiteGuardMiddleware
-from kiro_gateway.http_client import close_global_http_client
+from kiro_gateway.http_client import close_global_http_client, global_http_client_manager
 
 
 # --- Loguru 配置 ---
@@ -60,10 +60,18 @@ logger.add(
     sys.stderr,
     level=settings.log_level,
     colorize=True,
+    # 由后台线程写入 stderr，请求路径上只做入队
+    enqueue=True,
     format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
 )
 
 
+# logging 模块源文件路径，用于在 InterceptHandler 中跳过 logging 内部帧
+_LOGGING_FILE = logging.__file__
+# 向上查找调用帧的最大层数，防止异常调用栈下的无界回溯
+_MAX_FRAME_DEPTH = 20
+
+
 class InterceptHandler(logging.Handler):
     """
     拦截标准 logging 并重定向到 loguru。
@@ -71,6 +79,9 @@ class InterceptHandler(logging.Handler):
     这允许捕获来自 uvicorn、FastAPI 和其他使用标准 logging 而非 loguru 的库的日志。
     """
 
+    # (调用处文件, 行号) -> 栈深度；同一调用处经过的 logging 内部帧数固定，只需查找一次
+    _depth_cache: dict = {}
+
     def emit(self, record: logging.LogRecord) -> None:
         # 获取对应的 loguru 级别
         try:
@@ -78,11 +89,15 @@ class InterceptHandler(logging.Handler):
         except ValueError:
             level = record.levelno
 
-        # 查找调用帧以正确显示源
-        frame, depth = logging.currentframe(), 2
-        while frame.f_code.co_filename == logging.__file__:
-            frame = frame.f_back
-            depth += 1
+        # 查找调用帧以正确显示源（按调用处缓存，避免每条日志都回溯栈帧）
+        key = (record.pathname, record.lineno)
+        depth = self._depth_cache.get(key)
+        if depth is None:
+            frame, depth = inspect.currentframe(), 0
+            while frame and (depth == 0 or frame.f_code.co_filename == _LOGGING_FILE) and depth < _MAX_FRAME_DEPTH:
+                frame = frame.f_back
+                depth += 1
+            self._depth_cache[key] = depth
 
         logger.opt(depth=depth, exception=record.exc_info).log(level, record.getMessage())
 
@@ -256,6 +271,10 @@ async def lifespan(app: FastAPI):
     model_cache.set_auth_manager(auth_manager)
     app.state.model_cache = model_cache
 
+    # 预先创建全局 HTTP 客户端；与 Kiro API 的预连接在后台进行，不阻塞启动
+    await global_http_client_manager.get_client()
+    warmup_task = asyncio.create_task(global_http_client_manager.warmup([auth_manager.api_host]))
+
     # 仅在有全局凭证时启动后台刷新和初始填充
     if has_global_credentials:
         # 启动后台刷新任务
@@ -282,6 +301,10 @@ async def lifespan(app: FastAPI):
 
     logger.info("Shutting down application...")
 
+    # 停止 Token 信息同步（未启动时为空操作）
+    from kiro_gateway.token_info_sync import token_sync_service
+    await token_sync_service.stop()
+
     # Stop health checker
     await health_checker.stop()
 
@@ -289,6 +312,9 @@ async def lifespan(app: FastAPI):
     if has_global_credentials:
         await model_cache.stop_background_refresh()
 
+    # 预连接尚未完成时直接取消
+    warmup_task.cancel()
+
     # 关闭全局 HTTP 客户端
     await close_global_http_client()
 
@@ -310,9 +336,10 @@ app.add_middleware(RequestTrackingMiddleware)
 app.add_middleware(MetricsMiddleware)
 app.add_middleware(SiteGuardMiddleware)
 
-# 设置速率限制器
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, rate_limit_handler)
+# 设置速率限制器（RATE_LIMIT_PER_MINUTE = 0 时完全跳过 slowapi）
+if limiter is not None:
+    app.state.limiter = limiter
+    app.add_exception_handler(RateLimitExceeded, rate_limit_handler)
 
 # 注册验证错误处理器
 app.add_exception_handler(RequestValidationError, validation_exception_handler)
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+"""Shared test setup: keep the SQLite databases out of the working tree."""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+_DATA_DIR = tempfile.mkdtemp(prefix="kirogate-tests-")
+os.environ.setdefault("USER_DB_FILE", os.path.join(_DATA_DIR, "users.db"))
+os.environ.setdefault("METRICS_DB_FILE", os.path.join(_DATA_DIR, "metrics.db"))
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
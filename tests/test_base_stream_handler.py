@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Streaming must forward each upstream chunk without holding it back."""
+
+import asyncio
+import json
+
+from kiro_gateway.base_stream_handler import BaseStreamHandler
+
+
+class _Handler(BaseStreamHandler):
+    __slots__ = ()
+
+    def _generate_completion_id(self):
+        return "chatcmpl-test"
+
+    def _format_content_chunk(self, content, first_chunk):
+        return {"content": content}
+
+    def _format_tool_calls_chunk(self, tool_calls, index):
+        return {"tool_calls": tool_calls}
+
+    def _format_final_chunk(self, finish_reason, prompt_tokens, completion_tokens, total_tokens):
+        return {"finish_reason": finish_reason}
+
+    def _serialize_chunk(self, chunk):
+        if chunk.get("type") == "done":
+            return b"data: [DONE]\n\n"
+        return b"data: " + json.dumps(chunk).encode("utf-8") + b"\n\n"
+
+
+class _FakeResponse:
+    def __init__(self, byte_iterator):
+        self._byte_iterator = byte_iterator
+
+    def aiter_bytes(self):
+        return self._byte_iterator
+
+    async def aclose(self):
+        pass
+
+
+def test_lone_small_chunk_is_yielded_before_next_read():
+    next_read_requested = asyncio.Event()
+
+    async def upstream():
+        yield b'{"content":"Hello"}'
+        yield b'{"content":" world"}'
+        next_read_requested.set()
+        await asyncio.Event().wait()
+
+    async def run():
+        handler = _Handler(
+            client=None,
+            response=_FakeResponse(upstream()),
+            model="claude-sonnet-4-5",
+            model_cache=None,
+            auth_manager=None,
+            first_token_timeout=1,
+        )
+        stream = handler.stream()
+        try:
+            assert b"Hello" in await stream.__anext__()
+            second = await asyncio.wait_for(stream.__anext__(), timeout=1)
+            assert b" world" in second
+            # The chunk went out before the handler asked upstream for more data
+            assert not next_read_requested.is_set()
+        finally:
+            await stream.aclose()
+
+    asyncio.run(run())
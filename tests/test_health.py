@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+"""/health must answer through the full middleware stack."""
+
+from fastapi.testclient import TestClient
+
+from main import app
+
+
+def test_health_returns_ok_through_middleware_stack():
+    with TestClient(app) as client:
+        response = client.get("/health")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "healthy"
+    assert "X-Request-ID" not in response.headers
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""Retry classification for upstream failures."""
+
+import httpx
+import pytest
+
+from kiro_gateway.http_client import is_transient_error
+
+
+def _status_error(status_code: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "https://example.invalid")
+    response = httpx.Response(status_code, request=request)
+    return httpx.HTTPStatusError(f"HTTP {status_code}", request=request, response=response)
+
+
+@pytest.mark.parametrize("status_code", [429, 500, 503])
+def test_rate_limit_and_server_errors_are_transient(status_code):
+    assert is_transient_error(_status_error(status_code))
+
+
+@pytest.mark.parametrize("status_code", [400, 401, 403])
+def test_credential_and_client_errors_are_not_transient(status_code):
+    assert not is_transient_error(_status_error(status_code))
+
+
+def test_network_errors_are_transient_unless_unrecoverable():
+    assert is_transient_error(httpx.ConnectError("connection refused"))
+    assert not is_transient_error(httpx.UnsupportedProtocol("ftp://"))
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""Write-behind persistence of metrics counters."""
+
+import sqlite3
+
+from kiro_gateway import metrics as metrics_module
+from kiro_gateway.metrics import PrometheusMetrics
+
+
+def _new_metrics(tmp_path, monkeypatch) -> PrometheusMetrics:
+    monkeypatch.setattr(metrics_module, "METRICS_DB_FILE", str(tmp_path / "metrics.db"))
+    return PrometheusMetrics()
+
+
+def test_flush_persists_latest_counter_values(tmp_path, monkeypatch):
+    collector = _new_metrics(tmp_path, monkeypatch)
+    for _ in range(3):
+        collector.inc_request("/v1/chat/completions", 200, "claude-sonnet-4-5")
+        collector.record_request("/v1/chat/completions", 200, 12.5, "claude-sonnet-4-5", True, "openai")
+    collector.record_ip("10.0.0.1")
+    collector.flush()
+
+    with sqlite3.connect(tmp_path / "metrics.db") as conn:
+        counters = dict(conn.execute("SELECT key, value FROM counters"))
+        ip_count = conn.execute("SELECT count FROM ip_stats WHERE ip = '10.0.0.1'").fetchone()[0]
+        recent = conn.execute("SELECT COUNT(*) FROM recent_requests").fetchone()[0]
+
+    assert counters["req:/v1/chat/completions:200:claude-sonnet-4-5"] == 3
+    assert counters["stream_requests"] == 3
+    assert counters["api:openai"] == 3
+    assert ip_count == 1
+    assert recent == 3
+
+
+def test_reload_restores_flushed_counters(tmp_path, monkeypatch):
+    collector = _new_metrics(tmp_path, monkeypatch)
+    collector.inc_error("timeout")
+    collector.inc_error("timeout")
+    collector.flush()
+
+    reloaded = _new_metrics(tmp_path, monkeypatch)
+    assert reloaded._error_total["timeout"] == 2
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Completion tokens are counted per content event on the live streaming path."""
+
+import asyncio
+import json
+
+from kiro_gateway import streaming
+from kiro_gateway.tokenizer import CLAUDE_CORRECTION_FACTOR
+
+
+class _CharEncoder:
+    """One token per character, so counts are easy to predict."""
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, text, disallowed_special=()):
+        self.calls.append(text)
+        return list(text)
+
+
+class _FakeResponse:
+    def __init__(self, chunks):
+        self._chunks = chunks
+
+    async def _iter(self):
+        for chunk in self._chunks:
+            yield chunk
+
+    def aiter_bytes(self):
+        return self._iter()
+
+    async def aclose(self):
+        pass
+
+
+def test_openai_stream_counts_completion_tokens_per_content_event(monkeypatch):
+    encoder = _CharEncoder()
+    monkeypatch.setattr(streaming, "get_encoding", lambda: encoder)
+    response = _FakeResponse([b'{"content":"Hello"}', b'{"content":" world"}'])
+
+    async def run():
+        return [
+            chunk async for chunk in streaming.stream_kiro_to_openai_internal(
+                None, response, "claude-sonnet-4-5", None, None
+            )
+        ]
+
+    chunks = asyncio.run(run())
+    final = json.loads(chunks[-2][len("data: "):])
+
+    assert final["usage"]["completion_tokens"] == int(len("Hello world") * CLAUDE_CORRECTION_FACTOR)
+    # Each content event is encoded once as it arrives; the joined text is never re-encoded
+    assert encoder.calls == ["Hello", " world"]
@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+"""The token info sync service is not started by the application lifespan."""
+
+from fastapi.testclient import TestClient
+
+from kiro_gateway.token_info_sync import token_sync_service
+from main import app
+
+
+def test_lifespan_leaves_token_sync_stopped():
+    with TestClient(app):
+        assert not token_sync_service._running
+        assert token_sync_service._task is None
+
+    assert not token_sync_service._running
+    assert token_sync_service._task is None
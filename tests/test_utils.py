@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+"""json_dumps must accept everything json.dumps does."""
+
+import json
+
+from kiro_gateway.utils import json_dumps
+
+
+def test_json_dumps_keeps_non_ascii_text():
+    assert json.loads(json_dumps({"text": "привет"})) == {"text": "привет"}
+    assert "привет" in json_dumps({"text": "привет"})
+
+
+def test_json_dumps_falls_back_for_big_ints_and_non_str_keys():
+    payload = {"big": 2 ** 70, 1: "one"}
+    assert json.loads(json_dumps(payload)) == {"big": 2 ** 70, "1": "one"}